@@ -0,0 +1,297 @@
+import os
+import fnmatch
+import pygame
+from SPRITES_table import SPRITES
+
+
+
+"""
+The game images are only needed to draw the game. Everything the simulation
+needs from them, ie. the sizes of the images and the 2D bitmasks used for
+Pixel Perfect Collision, comes from the precomputed table in SPRITES_table.py,
+so importing the game modules neither reads the images folder nor needs a
+display. The images are loaded from disk the first time they are drawn.
+
+Run this script to regenerate SPRITES_table.py after changing an image:
+    python ASSETS_pygame.py
+"""
+
+
+# Folder of the game images, next to this script (not the working directory)
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
+# Cache of the loaded images, by file name
+_images = {}
+
+
+def load_image(name):
+    """Load an image of the images folder as a surface object, and double its
+    original size. Every image is only read from disk once.
+    Args:
+    - name: file name of the image, eg. "bg.png" (str)
+    """
+    image = _images.get(name)
+    if image is None:
+        image = _images[name] = pygame.transform.scale2x(
+            pygame.image.load(os.path.join(IMAGES_DIR, name))
+        )
+    return image
+
+
+def mask_runs(surface):
+    """Encode the 2D bitmask of a surface as a list of row runs:
+    (number of identical rows, [(first x, last x + 1), ...]) tuples, giving
+    the spans of set bits of each row.
+    Args:
+    - surface: pygame surface object
+    """
+    mask = pygame.mask.from_surface(surface)
+    width, height = mask.get_size()
+    runs = []
+    for y in range(height):
+        spans = []
+        x = 0
+        while x < width:
+            if mask.get_at((x, y)):
+                start = x
+                while x < width and mask.get_at((x, y)):
+                    x += 1
+                spans.append((start, x))
+            else:
+                x += 1
+        if runs and runs[-1][1] == spans:
+            runs[-1] = (runs[-1][0] + 1, spans)
+        else:
+            runs.append((1, spans))
+    return runs
+
+
+
+class Sprite:
+    """Class for a game image whose size and collision mask come from the
+    precomputed sprite table, and whose surface is only loaded from disk the
+    first time it is drawn. Like a surface object, a sprite has a size and a
+    rectangle.
+    """
+
+    # Maximum number of rotated copies of the image kept by rotated()
+    MAX_ROTATIONS = 64
+
+    def __init__(self, name, flip_y=False):
+        """Initialize a sprite of an image of the images folder.
+        Args:
+        - name: file name of the image, eg. "pipe.png" (str)
+        - flip_y: whether the image is flipped upside down (bool)
+        """
+        self.name = name
+        self.flip_y = flip_y
+        self.size = tuple(SPRITES[name]["size"])
+        self._mask = None
+        self._surface = None
+        self._display_surface = None
+        # Rotated copies of the display surface, by angle, and the surface ...
+        # ...they were rotated from
+        self._rotated = {}
+        self._rotated_source = None
+
+
+    def get_width(self):
+        """Return the width (in pixels) of the image."""
+        return self.size[0]
+
+
+    def get_height(self):
+        """Return the height (in pixels) of the image."""
+        return self.size[1]
+
+
+    def get_size(self):
+        """Return the (width, height) of the image."""
+        return self.size
+
+
+    def get_rect(self, **kwargs):
+        """Return the rectangle of the image, with its position given by
+        keyword arguments like Surface.get_rect(), eg. topleft=(x, y).
+        """
+        rect = pygame.Rect((0, 0), self.size)
+        for attr, value in kwargs.items():
+            setattr(rect, attr, value)
+        return rect
+
+
+    @property
+    def mask(self):
+        """The 2D bitmask of the image for Pixel Perfect Collision, built
+        once from the sprite table.
+        """
+        if self._mask is None:
+            height = self.size[1]
+            mask = pygame.mask.Mask(self.size)
+            y = 0
+            for count, spans in SPRITES[self.name]["mask"]:
+                for _ in range(count):
+                    # Flipped images have their rows in reverse order
+                    row = height - 1 - y if self.flip_y else y
+                    for start, end in spans:
+                        mask.draw(
+                            pygame.mask.Mask((end - start, 1), fill=True),
+                            (start, row),
+                        )
+                    y += 1
+            self._mask = mask
+        return self._mask
+
+
+    @property
+    def surface(self):
+        """The surface object of the image, loaded on first use."""
+        if self._surface is None:
+            surface = load_image(self.name)
+            if self.flip_y:
+                surface = pygame.transform.flip(
+                    surface=surface, flip_x=False, flip_y=True
+                )
+            self._surface = surface
+        return self._surface
+
+
+    def for_display(self):
+        """Get the surface of the image converted to the pixel format of the
+        display, which is much faster to blit. The conversion is done once,
+        as soon as a display mode has been set.
+        """
+        if self._display_surface is None:
+            if pygame.display.get_surface() is None:
+                return self.surface
+            if self.surface.get_flags() & pygame.SRCALPHA:
+                self._display_surface = self.surface.convert_alpha()
+            else:
+                self._display_surface = self.surface.convert()
+        return self._display_surface
+
+
+    def rotated(self, angle):
+        """Get the surface of the image rotated by an angle, like
+        pygame.transform.rotate(self.for_display(), angle), and the offset
+        (x, y) of its top left corner from the top left corner of the image
+        when both share the same center. Each angle is only rotated once: a
+        bird only ever takes a handful of tilts.
+        Args:
+        - angle: rotation in degrees, counterclockwise (int)
+        """
+        source = self.for_display()
+        # Start over once the image has been converted for the display
+        if source is not self._rotated_source:
+            self._rotated = {}
+            self._rotated_source = source
+        cached = self._rotated.get(angle)
+        if cached is None:
+            # Bound the cache, should the angles ever vary continuously
+            if len(self._rotated) >= self.MAX_ROTATIONS:
+                self._rotated.clear()
+            rotated = pygame.transform.rotate(source, angle)
+            width, height = self.size
+            rotated_width, rotated_height = rotated.get_size()
+            cached = self._rotated[angle] = (
+                rotated,
+                (width // 2 - rotated_width // 2,
+                 height // 2 - rotated_height // 2),
+            )
+        return cached
+
+
+def load_sprites(pattern):
+    """Get the sprites of all images whose file names match the pattern,
+    sorted by file name.
+    Args:
+    - pattern: glob pattern of the file names, eg. "bird*.png" (str)
+    """
+    return [Sprite(name) for name in sorted(fnmatch.filter(SPRITES, pattern))]
+
+
+def build_background(image, size):
+    """Pre-render the static background of a window of the given size from
+    an image, converted for fast blitting.
+    Args:
+    - image: pygame surface object of the background image
+    - size: (width, height) of the window
+    """
+    background = pygame.Surface(size)
+    background.blit(image, (0, 0))
+    return background.convert()
+
+
+
+class TextCache:
+    """Class for caching rendered text surfaces, so a text is only rendered
+    again when its value changes.
+    """
+
+    def __init__(self, font, color=(255, 255, 255)):
+        """Initialize the cache for a given font and text color.
+        Args:
+        - font: pygame font object
+        - color: text color (tuple)
+        """
+        self.font = font
+        self.color = color
+        # Last rendered text and surface, by label
+        self.texts = {}
+
+
+    def render(self, label, text):
+        """Get the rendered surface of a text, rendering it only if the text
+        shown for this label has changed.
+        Args:
+        - label: name of the text on screen, eg. "score" (str)
+        - text: text to render (str)
+        """
+        cached = self.texts.get(label)
+        if cached is None or cached[0] != text:
+            # antialias = True: Characters will have smooth edges
+            cached = self.texts[label] = (
+                text, self.font.render(text, True, self.color)
+            )
+        return cached[1]
+
+
+
+def write_sprite_table(path):
+    """Function to precompute the size and collision mask of every image of
+    the images folder, and write them to the sprite table module.
+    Args:
+    - path: path of the module to write (str)
+    """
+    lines = [
+        "# Generated by ASSETS_pygame.py from the images folder: do not edit.",
+        "# Size (width, height) of each image after doubling its original "
+        "size, and",
+        "# its 2D bitmask as (number of identical rows, [(first x, last x + "
+        "1), ...])",
+        "# runs of the spans of set bits of each row.",
+        "SPRITES = {",
+    ]
+    for name in sorted(os.listdir(IMAGES_DIR)):
+        if not name.endswith(".png"):
+            continue
+        surface = load_image(name)
+        lines.append("    \"{}\": {{".format(name))
+        lines.append("        \"size\": {!r},".format(surface.get_size()))
+        lines.append("        \"mask\": [")
+        for count, spans in mask_runs(surface):
+            lines.append("            ({}, {!r}),".format(count, spans))
+        lines.append("        ],")
+        lines.append("    },")
+    lines.append("}")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+
+# Regenerate the sprite table when this script is run directly
+if __name__ == "__main__":
+    write_sprite_table(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                     "SPRITES_table.py")
+    )
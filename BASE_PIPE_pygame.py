@@ -1,15 +1,17 @@
 import pygame
-import glob
+import random
 from random import randint
-from Bird_pygame import Bird
+from BIRD_pygame import Bird
+from COLLISION_pygame import collide_pipe, get_mask, CollisionProfiles
+from ASSETS_pygame import Sprite
 
 
 
-# Load each image from a file source as a surface object, and double its ...
-# ...original size
-BASE_IMG = pygame.transform.scale2x(pygame.image.load("./images/base.png"))
-PIPE_IMG = pygame.transform.scale2x(pygame.image.load("./images/pipe.png"))
-BG_IMG = pygame.transform.scale2x(pygame.image.load("./images/bg.png"))
+# Get the sprite of each image, which is only loaded from a file source ...
+# ...as a surface object (and doubled in size) once it is drawn
+BASE_IMG = Sprite("base.png")
+PIPE_IMG = Sprite("pipe.png")
+BG_IMG = Sprite("bg.png")
 
 # Moving distance along x-axis per frame for Base and Pipes
 BG_VEL = 5
@@ -19,7 +21,7 @@ class Base:
     """Class for the moving floor in the game
     """
 
-    # Get the surface object of the base floor image
+    # Get the sprite of the base floor image
     IMG = BASE_IMG
     # Get the width (in pixels) of the base floor image
     WIDTH = IMG.get_width()
@@ -67,8 +69,9 @@ class Base:
         Args:
         - win: pygame window or surface
         """
-        win.blit(self.IMG, (self.x1, self.y))
-        win.blit(self.IMG, (self.x2, self.y))
+        img = self.IMG.for_display()
+        win.blit(img, (self.x1, self.y))
+        win.blit(img, (self.x2, self.y))
 
 
 
@@ -77,9 +80,7 @@ class Pipe:
     """
 
     # Flip the pipe image upside down to represent the top pipe
-    TOP_IMG = pygame.transform.flip(
-        surface=PIPE_IMG, flip_x=False, flip_y=True
-    )
+    TOP_IMG = Sprite("pipe.png", flip_y=True)
     # Define the bottom pipe image
     BOTTOM_IMG = PIPE_IMG
     # Set the gap between top and bottom pipes
@@ -88,16 +89,25 @@ class Pipe:
     HEIGHT = TOP_IMG.get_height()
     # Get the width (in pixels) of the pipe image
     WIDTH = TOP_IMG.get_width()
+    # Collision tables of the bird images against the pipes, built on ...
+    # ...first use by profiles()
+    _profiles = None
 
-    def __init__(self, x: int):
+    def __init__(self, x: int, top_height: int = None, index: int = None):
         """Initialize the object of Pipe with a given x position.
         Args:
         - x: position on x-axis (int)
+        - top_height: height of the top pipe, eg. taken from a PipeSchedule
+        (int, default: random value between 50 and 450)
+        - index: index of the pipe in its course, if any (int)
         """
         self.x = x
+        self.index = index
         # Set the height for the top pipe using a random value between ...
-        # ...50 and 450
-        self.top_height = randint(50, 450)
+        # ...50 and 450, unless the height is given
+        if top_height is None:
+            top_height = randint(50, 450)
+        self.top_height = top_height
         # Calculate the y pos for the top left corner of the top and ...
         # ...bottom pipes
         self.top_y = -(self.HEIGHT - self.top_height)
@@ -122,33 +132,56 @@ class Pipe:
         Args:
         - bird: an object of BIRD
         """
-        # Get the masks for bird, top pipe and bottom pipe
-        bird_mask = bird.get_mask()
-        top_mask = pygame.mask.from_surface(self.TOP_IMG)
-        bottom_mask = pygame.mask.from_surface(self.BOTTOM_IMG)
-
-        # Use mask.overlap() method to detect Pixel Perfect Collision
-        # mask.overlap(other, offset) -> (x, y)
-        # mask.overlap(other, offset) -> None
-        # The overlap() method returns the first point of intersection ...
-        # ...encountered between this mask and other.
-
-        # Calculate the top_offset and bottom_offset that will be used as ...
-        # ...arguments in overlap() function
-        top_offset = (self.x - bird.x, self.top_y - round(bird.y))
-        bottom_offset = (self.x - bird.x, self.bottom_y - round(bird.y))
-        # Detect the collision point between the bird and top pipe
-        t_point = bird_mask.overlap(top_mask, top_offset)
-        # Detect the collision point between the bird and bottom pipe
-        b_point = bird_mask.overlap(bottom_mask, bottom_offset)
-
-        if (t_point is not None) or (b_point is not None):
-            # Return True if there is a collision between the bird and ...
-            # ...either the top or bottom pipe
-            return True
+        return self.collide_mask(bird.get_mask(), bird.x, bird.y)
+
+
+    def collide_mask(self, bird_mask, bird_x, bird_y):
+        """Method to detect Pixel Perfect Collision between a bird given by
+        its mask and position, and the pipes. Used by collide() with the
+        mask of the bird's current image.
+        Args:
+        - bird_mask: 2D bitmask of the bird's current image
+        - bird_x: position of the bird on x-axis
+        - bird_y: position of the bird on y-axis
+        """
+        # Use the cached masks of the pipes, and only compare them with ...
+        # ...the bird's mask where the bounding boxes overlap
+        return collide_pipe(bird_mask, bird_x, bird_y, self)
+
+
+    @classmethod
+    def profiles(cls):
+        """Get the CollisionProfiles of the bird images against the pipes,
+        built once on first use.
+        """
+        if cls._profiles is None:
+            cls._profiles = CollisionProfiles(
+                [get_mask(img) for img in Bird.IMGS],
+                get_mask(cls.TOP_IMG),
+                get_mask(cls.BOTTOM_IMG),
+            )
+        return cls._profiles
+
+
+    def collide_many(self, images, bird_x, bird_y, top_height=None):
+        """Method to detect collisions between many birds and the pipes in
+        one array operation, with the same results as collide() for each
+        bird. Returns a boolean array, one per bird.
+        Args:
+        - images: index in Bird.IMGS of the current image of each bird
+        - bird_x: position of the birds on x-axis, shared by all (int)
+        - bird_y: position of each bird on y-axis (float array)
+        - top_height: height of the top pipe for each bird, for birds
+        flying different courses (int array, default: this pipe's height)
+        """
+        if top_height is None:
+            top_y, bottom_y = self.top_y, self.bottom_y
         else:
-            # Return False if there is no collision
-            return False
+            top_y = top_height - self.HEIGHT
+            bottom_y = top_height + self.GAP
+        return self.profiles().collide(
+            images, bird_x, bird_y, self.x, top_y, bottom_y
+        )
 
 
     def draw(self, win):
@@ -156,8 +189,52 @@ class Pipe:
         Args:
         - win: pygame window or surface
         """
-        win.blit(self.TOP_IMG, (self.x, self.top_y))
-        win.blit(self.BOTTOM_IMG, (self.x, self.bottom_y))
+        win.blit(self.TOP_IMG.for_display(), (self.x, self.top_y))
+        win.blit(self.BOTTOM_IMG.for_display(), (self.x, self.bottom_y))
+
+
+
+class PipeSchedule:
+    """Class for a deterministic course: the sequence of top pipe heights
+    drawn from a seeded random number generator. The heights are generated
+    lazily the first time they are needed, so a course can be replayed
+    exactly by creating a new schedule with the same seed.
+    """
+
+    # Range of the random heights of the top pipes
+    MIN_HEIGHT = 50
+    MAX_HEIGHT = 450
+
+    def __init__(self, seed: int):
+        """Initialize the object of PipeSchedule with a given seed.
+        Args:
+        - seed: seed of the pipe heights (int)
+        """
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._heights = []
+
+
+    def __getitem__(self, index: int):
+        """Get the top pipe height of the pipe with the given index, the
+        first pipe of the course having index 0.
+        """
+        while len(self._heights) <= index:
+            self._heights.append(
+                self._rng.randint(self.MIN_HEIGHT, self.MAX_HEIGHT)
+            )
+        return self._heights[index]
+
+
+    @staticmethod
+    def generation_seed(seed: int, gen: int):
+        """Derive the course seed of a generation from the seed of a run, so
+        every generation of a run gets its own reproducible course.
+        Args:
+        - seed: seed of the run (int)
+        - gen: generation count (int)
+        """
+        return random.Random("{}:{}".format(seed, gen)).randrange(2**32)
 
 
 
@@ -188,7 +265,7 @@ def test_Base_Pipe_classes():
         # Set the game to run at most 30 frames per second
         clock.tick(30)
         # Draw background image onto the pygame window
-        win.blit(BG_IMG, (0, 0))
+        win.blit(BG_IMG.for_display(), (0, 0))
         # Draw the moving base floor image onto the pygame window
         base.move()
         base.draw(win)
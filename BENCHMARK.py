@@ -0,0 +1,384 @@
+from BIRD_pygame import Bird
+from BASE_PIPE_pygame import Pipe, PipeSchedule
+from POPULATION_numpy import BirdPopulation
+from NETWORK_numpy import BatchedNetwork
+from EXPORT_numpy import CompiledNetwork
+from Main import NeatApp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pygame
+import neat
+import argparse
+import platform
+import pickle
+import random
+import time
+import json
+import copy
+import os
+
+try:
+    # Peak memory of a process, only available on Unix
+    import resource
+except ImportError:
+    resource = None
+
+
+"""
+Benchmark suite for the simulation throughput and the generation wall time.
+
+- Micro benchmarks: Bird.move(), BirdPopulation.move(), Pipe.collide(),
+  FeedForwardNetwork.activate() and BatchedNetwork.activate(), reported as
+  calls (or bird-steps) per second, and the loading and decision latency of
+  the winner genome against its compiled network.
+- Generation benchmarks: one headless NeatApp.eval_genomes() per engine and
+  population size, reported as wall time, frames/second, bird-steps/second
+  and peak memory. Each one runs in a fresh process, so the peak memory is
+  that of the generation alone.
+
+Everything runs headless on a fixed seed: the genomes, their mutations and
+the pipe course are the same on every run, and the results are written as
+JSON so they can be compared between runs to catch regressions.
+
+Usage:
+    python BENCHMARK.py --output benchmark_results.json
+"""
+
+
+# Directory of this script, where the config file and winner genome are
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(ROOT_DIR, "config-feedforward.txt")
+WINNER_PATH = os.path.join(ROOT_DIR, "winner.pkl")
+
+
+def load_config(config_path=CONFIG_PATH):
+    """Load the NEAT config from the config file."""
+    return neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        config_path,
+    )
+
+
+def make_genomes(config, size, seed, trained_fraction=0.1):
+    """Create a reproducible list of (genome_id, genome) tuples: new random
+    genomes, plus a fraction of mutated copies of the winner genome (if
+    saved), which survive for longer like an evolved population does.
+    Args:
+    - config: the neat.config.Config of the genomes
+    - size: number of genomes (int)
+    - seed: seed of the genomes and their mutations (int)
+    - trained_fraction: fraction of genomes copied from the winner (float)
+    """
+    random.seed(seed)
+    winner = None
+    if os.path.exists(WINNER_PATH):
+        with open(WINNER_PATH, "rb") as f:
+            winner = pickle.load(f)
+
+    genomes = []
+    num_trained = int(size * trained_fraction) if winner else 0
+    for key in range(size):
+        if key < num_trained:
+            genome = copy.deepcopy(winner)
+            genome.key = key
+            genome.mutate(config.genome_config)
+        else:
+            genome = config.genome_type(key)
+            genome.configure_new(config.genome_config)
+        genomes.append((key, genome))
+    return genomes
+
+
+def peak_memory_mb():
+    """Return the peak resident memory of this process in MB, or None if it
+    is not available on this platform.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and in kilobytes on Linux
+    if platform.system() == "Darwin":
+        return peak / 2**20
+    return peak / 2**10
+
+
+def timed(func, repeat):
+    """Call a function 'repeat' times and return the elapsed seconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+def bench_bird_move(steps):
+    """Benchmark Bird.move() on a single bird."""
+    bird = Bird(230, 350)
+
+    def step():
+        # Jump regularly so the bird keeps a realistic trajectory
+        if bird.tick_count >= 20:
+            bird.jump()
+        bird.move()
+
+    seconds = timed(step, steps)
+    return {"calls": steps, "seconds": seconds, "calls_per_s": steps / seconds}
+
+
+def bench_population_move(size, steps):
+    """Benchmark BirdPopulation.move() on all birds of a population."""
+    birds = BirdPopulation(size, 230, 350)
+    jumpers = np.arange(0, size, 20)
+
+    def step():
+        birds.move()
+        birds.jump(jumpers)
+
+    seconds = timed(step, steps)
+    return {
+        "birds": size,
+        "steps": steps,
+        "seconds": seconds,
+        "bird_steps_per_s": size * steps / seconds,
+    }
+
+
+def bench_pipe_collide(calls, seed):
+    """Benchmark Pipe.collide() on birds spread around a pipe, so that both
+    the colliding and the missing cases are measured.
+    """
+    course = PipeSchedule(seed)
+    pipe = Pipe(200, course[0])
+    rng = random.Random(seed)
+    birds = []
+    for _ in range(100):
+        bird = Bird(230, rng.uniform(0, 650))
+        bird.img = Bird.IMGS[rng.randrange(len(Bird.IMGS))]
+        birds.append(bird)
+
+    collisions = 0
+    start = time.perf_counter()
+    for i in range(calls):
+        collisions += pipe.collide(birds[i % len(birds)])
+    seconds = time.perf_counter() - start
+    return {
+        "calls": calls,
+        "collisions": collisions,
+        "seconds": seconds,
+        "calls_per_s": calls / seconds,
+    }
+
+
+def bench_activation(config, size, repeat, seed):
+    """Benchmark FeedForwardNetwork.activate() for every genome of a
+    generation against one BatchedNetwork.activate() call for all of them.
+    """
+    genomes = [g for _, g in make_genomes(config, size, seed)]
+    rng = np.random.default_rng(seed)
+    inputs = rng.uniform(0, 700, (size, 3))
+    rows = [tuple(row) for row in inputs.tolist()]
+
+    nets = [neat.nn.FeedForwardNetwork.create(g, config) for g in genomes]
+
+    def activate_all():
+        for net, row in zip(nets, rows):
+            net.activate(row)
+
+    net_seconds = timed(activate_all, repeat)
+    batched = BatchedNetwork(genomes, config)
+    batched_seconds = timed(lambda: batched.activate(inputs), repeat)
+    return {
+        "networks": size,
+        "repeat": repeat,
+        "feed_forward_activations_per_s": size * repeat / net_seconds,
+        "batched_activations_per_s": size * repeat / batched_seconds,
+    }
+
+
+def bench_compiled_network(config, repeat, seed):
+    """Benchmark loading the winner genome and making one decision with it,
+    as a pickled genome with FeedForwardNetwork, and as a compiled network
+    activated on a single state and on a batch of states.
+    """
+    with open(WINNER_PATH, "rb") as f:
+        winner = pickle.load(f)
+    data = CompiledNetwork.from_genome(winner, config).to_bytes()
+    pickled = pickle.dumps(winner)
+    rng = np.random.default_rng(seed)
+    batch = rng.uniform(0, 700, (1000, 3))
+    state = tuple(batch[0].tolist())
+
+    net = neat.nn.FeedForwardNetwork.create(winner, config)
+    compiled = CompiledNetwork.from_bytes(data)
+    compiled.activate(state)
+    load_seconds = timed(
+        lambda: neat.nn.FeedForwardNetwork.create(
+            pickle.loads(pickled), config
+        ),
+        repeat,
+    )
+    compiled_load_seconds = timed(
+        lambda: CompiledNetwork.from_bytes(data), repeat
+    )
+    net_seconds = timed(lambda: net.activate(state), repeat)
+    compiled_seconds = timed(lambda: compiled.activate(state), repeat)
+    batch_seconds = timed(
+        lambda: compiled.activate_batch(batch), repeat // 100
+    )
+    return {
+        "repeat": repeat,
+        "genome_load_us": load_seconds / repeat * 1e6,
+        "compiled_load_us": compiled_load_seconds / repeat * 1e6,
+        "feed_forward_decision_us": net_seconds / repeat * 1e6,
+        "compiled_decision_us": compiled_seconds / repeat * 1e6,
+        "compiled_batch_decisions_per_s": (
+            len(batch) * (repeat // 100) / batch_seconds
+        ),
+    }
+
+
+
+class _CountingApp(NeatApp):
+    """Headless NEAT app counting the frames and bird-steps simulated."""
+
+    def update_pipes(self):
+        """Count the frame and the birds alive, then update the pipes."""
+        self.frames += 1
+        self.bird_steps += len(self.birds)
+        super().update_pipes()
+
+
+def bench_generation(engine, size, seed, max_score):
+    """Benchmark one headless generation of the given engine and size. Runs
+    in a fresh worker process, see run_in_process().
+    """
+    app = _CountingApp(CONFIG_PATH, headless=True, engine=engine, seed=seed)
+    app.MAX_SCORE = max_score
+    app.frames = 0
+    app.bird_steps = 0
+    genomes = make_genomes(app.config, size, seed)
+
+    start = time.perf_counter()
+    app.eval_genomes(genomes, app.config)
+    seconds = time.perf_counter() - start
+    return {
+        "engine": engine,
+        "population": size,
+        "seconds": seconds,
+        "frames": app.frames,
+        "score": app.score,
+        "frames_per_s": app.frames / seconds,
+        "bird_steps": app.bird_steps,
+        "bird_steps_per_s": app.bird_steps / seconds,
+        "best_fitness": max(g.fitness for _, g in genomes),
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+def run_in_process(func, *args):
+    """Run a benchmark function in a fresh process and return its result."""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(func, *args).result()
+
+
+def run_benchmarks(sizes, engines, seed, max_score, quick=False):
+    """Run the whole benchmark suite and return the results as a dict.
+    Args:
+    - sizes: population sizes of the generation benchmarks (list of int)
+    - engines: engines of the generation benchmarks (list of str)
+    - seed: seed of the genomes and courses (int)
+    - max_score: score ending each benchmarked generation (int)
+    - quick: run fewer iterations of the micro benchmarks (bool)
+    """
+    scale = 10 if quick else 1
+    config = load_config()
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": seed,
+            "max_score": max_score,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "neat": getattr(neat, "__version__", None),
+        },
+        "micro": {},
+        "generations": [],
+    }
+
+    micro = results["micro"]
+    print("Bird.move ...")
+    micro["bird_move"] = bench_bird_move(200000 // scale)
+    print("BirdPopulation.move ...")
+    micro["population_move"] = bench_population_move(10000, 1000 // scale)
+    print("Pipe.collide ...")
+    micro["pipe_collide"] = bench_pipe_collide(100000 // scale, seed)
+    print("Network activation ...")
+    micro["activation"] = bench_activation(config, 1000, 50 // scale, seed)
+    print("Compiled network ...")
+    micro["compiled_network"] = bench_compiled_network(
+        config, 100000 // scale, seed
+    )
+
+    for engine in engines:
+        for size in sizes:
+            print("Generation: engine={}, population={} ...".format(
+                engine, size
+            ))
+            results["generations"].append(
+                run_in_process(bench_generation, engine, size, seed, max_score)
+            )
+    return results
+
+
+
+# Check if this script is being run directly (and not imported as a module)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the simulation throughput and generation "
+        "wall time."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+        help="population sizes of the generation benchmarks",
+    )
+    parser.add_argument(
+        "--engines", nargs="+", choices=NeatApp.ENGINES,
+        default=list(NeatApp.ENGINES),
+        help="engines of the generation benchmarks",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="seed of the genomes and pipe courses",
+    )
+    parser.add_argument(
+        "--max-score", type=int, default=20,
+        help="score ending each benchmarked generation",
+    )
+    parser.add_argument(
+        "--quick", action="store_true",
+        help="run fewer iterations of the micro benchmarks",
+    )
+    parser.add_argument(
+        "--output", default="benchmark_results.json",
+        help="path of the JSON results file",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        args.sizes, args.engines, args.seed, args.max_score, args.quick
+    )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    # Show a summary of the generation benchmarks in the terminal
+    for r in results["generations"]:
+        print(
+            "{engine:>8} {population:>6} birds: {seconds:8.2f} s, "
+            "{frames_per_s:9.1f} frames/s, {bird_steps_per_s:11.0f} "
+            "bird-steps/s".format(**r)
+        )
+    print("Results written to {}".format(args.output))
@@ -1,24 +1,23 @@
 # Pygame is library for the development of multimedia applications ...
 # ...like video games using Python
 import pygame
-import glob
+from ASSETS_pygame import Sprite, load_sprites
+from COLLISION_pygame import get_mask
+from TRAJECTORY_numpy import Trajectory
 
 
 
-# Load each image from a file source as a surface object, and double its ...
-# ...original size
-BIRD_IMGS = [
-    pygame.transform.scale2x(pygame.image.load(image))
-    for image in glob.glob("./images/bird*.png")
-]
-BG_IMG = pygame.transform.scale2x(pygame.image.load("./images/bg.png"))
+# Get the sprite of each image, which is only loaded from a file source ...
+# ...as a surface object (and doubled in size) once it is drawn. The bird ...
+# ...images are sorted: bird1, bird2, bird3
+BIRD_IMGS = load_sprites("bird*.png")
+BG_IMG = Sprite("bg.png")
 
 
 class Bird:
     """Class for a flappy bird"""
 
-    # Load each bird image from a file source as a surface object, and ...
-    # ...double their original size
+    # Get the sprites of the bird images, doubled in size
     IMGS = BIRD_IMGS
     # Maximum rotation degrees of a bird
     MAX_ROTATION = 25
@@ -28,6 +27,11 @@ class Bird:
     ANIMATION_TIME = 5
     # Set acceleration value for calculating displacement
     ACCELERATION = 3
+    # Velocity of a bird when it jumps
+    JUMP_VEL = -10.5
+    # Precomputed trajectories after spawning (velocity 0) and after a jump
+    SPAWN_TRAJECTORY = Trajectory(0, ACCELERATION, MAX_ROTATION, ROT_VEL)
+    JUMP_TRAJECTORY = Trajectory(JUMP_VEL, ACCELERATION, MAX_ROTATION, ROT_VEL)
 
     def __init__(self, x: int, y: int):
         """Initialize an object of Bird.
@@ -44,19 +48,25 @@ class Bird:
         self.tilt = 0
         # Initialize tick_count at 0 for a jumping-falling session
         self.tick_count = 0
-        # Initialize velocity for calculating displacement
+        # Initialize velocity for calculating displacement, and the ...
+        # ...trajectory of the jumping-falling session it starts
         self.vel = 0
+        self.trajectory = self.SPAWN_TRAJECTORY
         # Set starting image of the bird
         self.img = self.IMGS[0]
         # Initialize img_count at 0 for a wings flapping session: ↖ ↼ ↙ ↼
         self.img_count = 0
+        # Whether the bird's controller last decided to jump, an action ...
+        # ...held until its next decision
+        self.jumping = False
 
 
     def jump(self):
         """Method to make the bird jump
         """
         # Whenever the bird starts to move upwards, set velocity to be -10.5
-        self.vel = -10.5
+        self.vel = self.JUMP_VEL
+        self.trajectory = self.JUMP_TRAJECTORY
         # Reset tick_count back to 0 everytime the bird jumps
         self.tick_count = 0
         # Reset the original height
@@ -72,43 +82,26 @@ class Bird:
         """Displacement: moving distance along y axis
         Displacement = [initial velocity] * [time]
                        + 0.5 * [acceleration] * ([time]**2)
+        clamped to 16 pixels down, and 2 pixels more when moving up. The
+        displacement and the tilt of each tick are looked up in the
+        precomputed trajectory (see TRAJECTORY_numpy.py): the bird keeps
+        its nose up until it drops more than 50 pixels below its original
+        height, then tilts down by ROT_VEL degrees per tick down to -90.
         """
-        displacement = (
-            self.vel * self.tick_count
-            + 0.5 * self.ACCELERATION
-            * (self.tick_count**2)
-        )
-
-        # If the bird is about to move down by more than 16 pixels, make ...
-        # ...the displacement remain at 16
-        if displacement >= 16:
-            displacement = 16
-        # If the bird is about to move up, move up the bird a bit more ...
-        # ...by 2 more pixels
-        if displacement < 0:
-            displacement -= 2
-
-        # Update y position of bird
-        self.y += displacement
-
-        if self.y < self.height + 50:
-            # Do not tilt the bird's nose down until it drops more than 50 ...
-            # ...pixels below its original height
-            self.tilt = self.MAX_ROTATION
-        else:
-            # Start tilting down the bird once it's dropped more than 50 ...
-            # ...pixels below the original height
-            if self.tilt > -90:
-                # Tilting down the bird by ROT_VEL degrees in each ...
-                # ...frame/tick until the degrees of rotation become ...
-                # ...lower than -90
-                self.tilt -= self.ROT_VEL
+        trajectory = self.trajectory
+        tick = self.tick_count
+        if tick > trajectory.ticks:
+            tick = trajectory.ticks
 
+        # Update y position and tilt of bird
+        self.y += trajectory.displacements[tick]
+        self.tilt = trajectory.tilts[tick]
 
-    def draw(self, win):
-        """Draw the bird flapping wings on the pygame window.
-        Args:
-        - win: pygame window or surface
+
+    def animate(self):
+        """Method to advance the wing flapping animation by one frame. The
+        current image also decides the bird's collision mask, so it has to be
+        updated every frame even when nothing is drawn (headless mode).
         """
         # Incrementing img_count
         self.img_count += 1
@@ -132,21 +125,109 @@ class Bird:
             self.img = self.IMGS[1]
             self.img_count = self.ANIMATION_TIME * 2
 
-        # Rotate the bird image on pygame window
-        rotated_image = pygame.transform.rotate(self.img, self.tilt)
-        # Get the rectangle of the rotated image
-        rotated_image_rect = rotated_image.get_rect(
-            center=self.img.get_rect(topleft=(self.x, self.y)).center
-        )
-        # Draw the rotated image onto the pygame window
-        win.blit(source=rotated_image, dest=rotated_image_rect.topleft)
+
+    def draw(self, win):
+        """Draw the bird flapping wings on the pygame window.
+        Args:
+        - win: pygame window or surface
+        """
+        # Update the bird image to show the next wing flapping state
+        self.animate()
+        self.render(win)
+
+
+    def render(self, win):
+        """Draw the bird's current image, rotated by its tilt, on the pygame
+        window, without advancing the wing flapping animation.
+        Args:
+        - win: pygame window or surface
+        """
+        # Get the bird image rotated around its center, only rotated the ...
+        # ...first time this image is drawn with this tilt
+        rotated_image, (offset_x, offset_y) = self.img.rotated(self.tilt)
+        # Draw the rotated image onto the pygame window, with the same ...
+        # ...center as the unrotated image
+        left, top = self.img.get_rect(topleft=(self.x, self.y)).topleft
+        win.blit(source=rotated_image, dest=(left + offset_x, top + offset_y))
 
 
     def get_mask(self):
         """Get the 2D bitmask from the surface object of the bird's current
-        image for fast detection of Pixel Perfect Collision.
+        image for fast detection of Pixel Perfect Collision. The masks of the
+        three bird images are built once from the sprite table.
+        """
+        return get_mask(self.img)
+
+
+
+class Flock:
+    """Class for the birds alive in a generation, each stored together with
+    the genome and neural network controlling it. Dead birds are removed in
+    a single pass over the flock, however many birds die in the same frame.
+    """
+
+    def __init__(self):
+        """Initialize an empty flock."""
+        # List of (genome, net, bird) tuples of the birds alive
+        self.members = []
+
+
+    def __len__(self):
+        """Return the number of birds alive."""
+        return len(self.members)
+
+
+    def __iter__(self):
+        """Iterate over the (genome, net, bird) tuples of the birds alive."""
+        return iter(self.members)
+
+
+    def add(self, genome, net, bird):
+        """Method to add a bird with its genome and neural network.
+        Args:
+        - genome: genome of the bird
+        - net: neural network created from the genome
+        - bird: an object of BIRD
+        """
+        self.members.append((genome, net, bird))
+
+
+    def remove(self, indices):
+        """Method to remove the birds at the given positions of the flock,
+        keeping the other birds in the same order.
+        Args:
+        - indices: positions of the birds to remove
+        """
+        if indices:
+            indices = set(indices)
+            self.members = [
+                member for i, member in enumerate(self.members)
+                if i not in indices
+            ]
+
+
+    def reward(self, points):
+        """Method to add fitness points to the genomes of all birds alive.
+        Args:
+        - points: fitness points added to each genome (float)
+        """
+        for genome, net, bird in self.members:
+            genome.fitness += points
+
+
+    def animate(self):
+        """Method to advance the wing flapping states of all birds alive."""
+        for genome, net, bird in self.members:
+            bird.animate()
+
+
+    def draw(self, win):
+        """Draw all birds alive on the pygame window.
+        Args:
+        - win: pygame window or surface
         """
-        return pygame.mask.from_surface(self.img)
+        for genome, net, bird in self.members:
+            bird.draw(win)
 
 
 
@@ -164,7 +245,7 @@ def test_Bird_class():
         # Set the game to run at most 30 frames per second
         clock.tick(30)
         # Draw background image onto the pygame window
-        win.blit(BG_IMG, (0, 0))
+        win.blit(BG_IMG.for_display(), (0, 0))
         # Make the bird move
         bird.move()
         # Draw the bird onto the pygame window
@@ -0,0 +1,141 @@
+import configparser
+import numpy as np
+
+
+
+"""
+Successive-halving evaluation budget of a generation. Instead of simulating
+every bird until it dies or the score exceeds MAX_SCORE, the generation is
+simulated on a short horizon first, and only the most promising fraction of
+the birds still alive carries on to a longer horizon, and so on, up to an
+optional cap on the frames of a generation.
+
+The fitness stays the same as without a budget (+0.1 per frame, +5 per pipe
+passed): a bird that is stopped at a horizon simply keeps the fitness it had
+reached, like a bird that died there. As all birds fly the same course, the
+birds still alive at a horizon all have the same fitness, so the birds that
+carry on are those flying closest to the center of the gap of the upcoming
+pipe, ie. those with the largest safety margin. The ranking of the fitness
+scores is therefore unchanged: birds that died earlier rank lower, and birds
+that carried on rank at least as high as the ones that were stopped.
+
+The budget is read from the [EvaluationBudget] section of the NEAT config
+file:
+    enabled         = True
+    # Horizon (in frames) of the first rung
+    initial_frames  = 300
+    # Factor by which the horizon grows from one rung to the next
+    growth          = 2.0
+    # Fraction of the birds still alive carrying on at each horizon
+    keep_fraction   = 0.5
+    # Minimum number of birds carrying on at each horizon
+    min_birds       = 1
+    # Cap on the frames of a generation, 0 for no cap
+    max_frames      = 0
+
+The birds carrying on are chosen among all the birds of the generation, so
+the budget cannot be used when the generation is split across worker
+processes (--workers): NeatApp refuses the combination.
+"""
+
+
+
+class EvaluationBudget:
+    """Class for the successive-halving schedule of the frames simulated in
+    a generation.
+    """
+
+    # Section of the NEAT config file holding the budget
+    SECTION = "EvaluationBudget"
+
+    def __init__(self, initial_frames=300, growth=2.0, keep_fraction=0.5,
+                 min_birds=1, max_frames=0):
+        """Initialize the budget.
+        Args:
+        - initial_frames: horizon (in frames) of the first rung (int)
+        - growth: factor by which the horizon grows at each rung (float)
+        - keep_fraction: fraction of the birds alive carrying on (float)
+        - min_birds: minimum number of birds carrying on (int)
+        - max_frames: cap on the frames of a generation, 0 for none (int)
+        """
+        if initial_frames < 1 or growth <= 1:
+            raise ValueError(
+                "The budget needs initial_frames >= 1 and growth > 1"
+            )
+        if not 0 < keep_fraction <= 1:
+            raise ValueError("keep_fraction must be in (0, 1]")
+        self.initial_frames = initial_frames
+        self.growth = growth
+        self.keep_fraction = keep_fraction
+        self.min_birds = min_birds
+        self.max_frames = max_frames
+
+
+    @classmethod
+    def from_config_file(cls, config_path):
+        """Read the budget from the NEAT config file, or return None if the
+        file has no enabled [EvaluationBudget] section.
+        Args:
+        - config_path: The path to the configuration file.
+        """
+        parser = configparser.ConfigParser()
+        parser.read(config_path)
+        if not parser.has_section(cls.SECTION):
+            return None
+        section = parser[cls.SECTION]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+        return cls(
+            initial_frames=section.getint("initial_frames", fallback=300),
+            growth=section.getfloat("growth", fallback=2.0),
+            keep_fraction=section.getfloat("keep_fraction", fallback=0.5),
+            min_birds=section.getint("min_birds", fallback=1),
+            max_frames=section.getint("max_frames", fallback=0),
+        )
+
+
+    def next_horizon(self, horizon=None):
+        """Get the horizon (in frames) of the rung following a horizon, or
+        the first one if no horizon is given.
+        Args:
+        - horizon: horizon of the current rung (int)
+        """
+        if horizon is None:
+            return self.initial_frames
+        return max(int(horizon * self.growth), horizon + 1)
+
+
+    def keep_count(self, num_alive):
+        """Get the number of birds carrying on to the next rung.
+        Args:
+        - num_alive: number of birds alive at the horizon (int)
+        """
+        keep = int(np.ceil(num_alive * self.keep_fraction))
+        return min(num_alive, max(keep, self.min_birds))
+
+
+    def out_of_frames(self, frame_count):
+        """Check if a generation has used up its frames.
+        Args:
+        - frame_count: number of frames simulated (int)
+        """
+        return 0 < self.max_frames <= frame_count
+
+
+
+def select_stopped(y, img_height, gap_center, keep):
+    """Choose the birds stopped at a horizon: all but the 'keep' birds whose
+    center is the closest to the center of the gap of the upcoming pipe. Ties
+    are broken by position, so the choice is deterministic.
+    Args:
+    - y: positions of the birds alive on y-axis (sequence of float)
+    - img_height: height (in pixels) of the bird images (int)
+    - gap_center: center of the gap of the upcoming pipe on y-axis, shared
+    by all birds or one per bird (float or array)
+    - keep: number of birds carrying on (int)
+    Returns the positions (in y) of the stopped birds, in increasing order.
+    """
+    margins = np.abs(np.asarray(y, dtype=np.float64) + img_height / 2
+                     - gap_center)
+    order = np.argsort(margins, kind="stable")
+    return np.sort(order[keep:])
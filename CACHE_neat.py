@@ -0,0 +1,172 @@
+import hashlib
+import configparser
+from collections import OrderedDict
+from neat.reporting import BaseReporter
+
+
+
+"""
+Fitness cache of the genomes that go into the next generation unchanged:
+the elites and the species survivors are otherwise simulated again every
+generation, although their fitness on the same course cannot change.
+
+A genome is identified by a hash of everything its network is built from:
+its nodes (bias, response, activation, aggregation) and its enabled
+connections (weight), so a copy of a genome under another key hits the cache
+too, and any mutation misses it. The fitness is cached per course: the key
+of a course holds its seed and every setting the fitness depends on, so a
+genome only hits the cache when it flies a course it has already flown, ie.
+with --fixed-course, or when the course of a seeded generation repeats. The
+least recently used entries are evicted once the cache is full.
+
+With the fitness, the cache keeps the flight of the genome on the course:
+the frames it was simulated for, the score it reached, and the frames each
+of its birds survived (one per course). A bird served from the cache would
+have kept the game going as long as it flew, so its flight is added to the
+score, frames and birds alive over time of the generation.
+
+Each bird flies on its own, so its fitness on a course does not depend on
+the rest of the generation, except with the evaluation budget, which stops
+birds by comparing them with the others: the cache is not used then.
+
+The cache is configured in the [FitnessCache] section of the NEAT config
+file:
+    enabled     = True
+    # Maximum number of cached fitness scores
+    max_entries = 1000
+"""
+
+
+
+def genome_hash(genome):
+    """Get the hash of the network of a genome (bytes): its nodes and its
+    enabled connections, with the floats written exactly.
+    Args:
+    - genome: a neat.DefaultGenome
+    """
+    nodes = sorted(
+        (key, ng.bias, ng.response, ng.activation, ng.aggregation)
+        for key, ng in genome.nodes.items()
+    )
+    connections = sorted(
+        (key, cg.weight) for key, cg in genome.connections.items()
+        if cg.enabled
+    )
+    return hashlib.blake2b(
+        repr((nodes, connections)).encode(), digest_size=16
+    ).digest()
+
+
+
+class FitnessCache:
+    """Class for a bounded LRU cache of fitness scores, keyed by genome hash
+    and course, counting its hits and misses.
+    """
+
+    # Section of the NEAT config file holding the settings
+    SECTION = "FitnessCache"
+
+    def __init__(self, max_entries=1000):
+        """Initialize an empty cache.
+        Args:
+        - max_entries: maximum number of cached fitness scores (int)
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    @classmethod
+    def from_config_file(cls, config_path):
+        """Read the settings from the NEAT config file, or return None if the
+        file has no enabled [FitnessCache] section.
+        Args:
+        - config_path: The path to the configuration file.
+        """
+        parser = configparser.ConfigParser()
+        parser.read(config_path)
+        if not parser.has_section(cls.SECTION):
+            return None
+        section = parser[cls.SECTION]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+        return cls(max_entries=section.getint("max_entries", fallback=1000))
+
+
+    def lookup(self, genomes, course):
+        """Set the fitness of the genomes found in the cache, and return the
+        others, which have to be simulated.
+        Args:
+        - genomes: list of (genome_id, genome) tuples
+        - course: key of the course flown (hashable)
+        Returns the list of (genome_id, genome) tuples missing the cache,
+        and the list of the flights of the genomes found in it.
+        """
+        missing = []
+        flights = []
+        for g_id, g in genomes:
+            key = (genome_hash(g), course)
+            entry = self.entries.get(key)
+            if entry is None:
+                missing.append((g_id, g))
+            else:
+                self.entries.move_to_end(key)
+                g.fitness, flight = entry
+                flights.append(flight)
+        self.hits += len(flights)
+        self.misses += len(missing)
+        return missing, flights
+
+
+    def store(self, genomes, course, flights):
+        """Method to cache the fitness and flight of simulated genomes,
+        evicting the least recently used entries once the cache is full.
+        Args:
+        - genomes: list of (genome_id, genome) tuples
+        - course: key of the course flown (hashable)
+        - flights: (frames, score, survived frames of each bird) of each
+        genome, in the same order (list of tuples)
+        """
+        for (g_id, g), flight in zip(genomes, flights):
+            key = (genome_hash(g), course)
+            self.entries[key] = (g.fitness, flight)
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+
+class FitnessCacheReporter(BaseReporter):
+    """Class for a neat-python reporter printing the hits and misses of a
+    FitnessCache in every generation.
+    """
+
+    def __init__(self, cache):
+        """Initialize the reporter.
+        Args:
+        - cache: the FitnessCache of the evaluated generations
+        """
+        self.cache = cache
+        # (generation, hits, misses) of every generation
+        self.history = []
+        self.generation = None
+
+
+    def start_generation(self, generation):
+        """Record the generation number, and reset the counts."""
+        self.generation = generation
+        self.cache.hits = 0
+        self.cache.misses = 0
+
+
+    def post_evaluate(self, config, population, species, best_genome):
+        """Print the hits and misses of the generation just evaluated."""
+        self.history.append(
+            (self.generation, self.cache.hits, self.cache.misses)
+        )
+        print("Fitness cache: {} hits, {} misses, {} entries".format(
+            self.cache.hits, self.cache.misses, len(self.cache.entries)
+        ))
@@ -0,0 +1,262 @@
+import os
+import re
+import zlib
+import pickle
+import random
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor
+import neat
+from neat.reporting import BaseReporter
+
+
+
+"""
+Checkpointing of a NEAT run, so that a long training run can be resumed after
+a crash or on a preemptible machine instead of starting over.
+
+A checkpoint is taken at the end of a generation, once the next generation
+has been bred and divided into species, and holds everything needed to carry
+on exactly where the run stopped:
+- the genomes of the next generation (not evaluated yet)
+- the species set: the species with their members, representatives and
+  fitness history (used by the stagnation), and the next species id
+- the reproduction state: the next genome id and the ancestors of the genomes
+- the next node id of the genome config, once nodes have been added
+- the best genome found so far
+- the state of the random module, and the number of the next generation
+
+With a seeded run (--seed), a resumed run evolves exactly like the run would
+have without interruption. The statistics of StatisticsReporter start over.
+
+The state is pickled in the main thread, which is quick and makes the
+checkpoint independent of the next generations. Compressing and writing the
+file, which is the slow part, is done in a background thread while the next
+generation is evaluated.
+
+File format: the MAGIC bytes, followed by the zlib-compressed pickle of the
+state dict. Files are written to a temporary file first and then renamed, so
+a crash while writing never leaves a truncated checkpoint behind.
+"""
+
+
+# First bytes of every checkpoint file, with the version of the format
+MAGIC = b"NEATCKPT1\n"
+
+
+def _next_value(counter):
+    """Get the next value of an itertools.count without consuming it, and a
+    fresh counter starting at that value to use in its place.
+    """
+    value = next(counter)
+    return value, count(value)
+
+
+def checkpoint_path(prefix, generation):
+    """Get the path of the checkpoint of a generation.
+    Args:
+    - prefix: path prefix of the checkpoint files (str)
+    - generation: number of the next generation to evaluate (int)
+    """
+    return "{}{}.ckpt".format(prefix, generation)
+
+
+def list_checkpoints(prefix):
+    """Get the (generation, path) tuples of the checkpoints written with a
+    path prefix, sorted by generation.
+    Args:
+    - prefix: path prefix of the checkpoint files (str)
+    """
+    folder, name = os.path.split(prefix)
+    if not os.path.isdir(folder or "."):
+        return []
+    pattern = re.compile(re.escape(name) + r"(\d+)\.ckpt$")
+    checkpoints = []
+    for file_name in os.listdir(folder or "."):
+        match = pattern.match(file_name)
+        if match:
+            checkpoints.append(
+                (int(match.group(1)), os.path.join(folder, file_name))
+            )
+    return sorted(checkpoints)
+
+
+def latest_checkpoint(prefix):
+    """Get the path of the latest checkpoint written with a path prefix, or
+    None if there is none.
+    Args:
+    - prefix: path prefix of the checkpoint files (str)
+    """
+    checkpoints = list_checkpoints(prefix)
+    return checkpoints[-1][1] if checkpoints else None
+
+
+def capture_state(population, generation=None):
+    """Capture the state of a NEAT population between two generations as a
+    pickled dict.
+    Args:
+    - population: the neat.Population being run
+    - generation: number of the next generation to evaluate (default: the
+    one following population.generation, as in end_generation())
+    """
+    reproduction = population.reproduction
+    species_set = population.species
+    genome_config = population.config.genome_config
+    next_genome_id, reproduction.genome_indexer = _next_value(
+        reproduction.genome_indexer
+    )
+    next_species_id, species_set.indexer = _next_value(species_set.indexer)
+    # The node indexer is only created once a node is added
+    next_node_id = None
+    if genome_config.node_indexer is not None:
+        next_node_id, genome_config.node_indexer = _next_value(
+            genome_config.node_indexer
+        )
+    if generation is None:
+        # Generation is incremented right after end_generation()
+        generation = population.generation + 1
+    state = {
+        "generation": generation,
+        "population": population.population,
+        "species": species_set.species,
+        "genome_to_species": species_set.genome_to_species,
+        "next_species_id": next_species_id,
+        "next_genome_id": next_genome_id,
+        "next_node_id": next_node_id,
+        "ancestors": reproduction.ancestors,
+        "best_genome": population.best_genome,
+        "random_state": random.getstate(),
+    }
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def write_checkpoint(path, data):
+    """Compress a pickled state and write it as a checkpoint file.
+    Args:
+    - path: path of the checkpoint file (str)
+    - data: pickled state, as returned by capture_state() (bytes)
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(zlib.compress(data, 6))
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    """Read the state dict of a checkpoint file.
+    Args:
+    - path: path of the checkpoint file (str)
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a checkpoint file".format(path))
+        return pickle.loads(zlib.decompress(f.read()))
+
+
+def restore_population(path, config):
+    """Load a checkpoint file and rebuild the NEAT population it was taken
+    from. The state of the random module is restored too.
+    Args:
+    - path: path of the checkpoint file (str)
+    - config: the neat.config.Config of the run
+    """
+    state = read_checkpoint(path)
+
+    population = neat.Population(
+        config, (state["population"], None, state["generation"])
+    )
+    # The species set reports to the reporters of the new population
+    species_set = config.species_set_type(
+        config.species_set_config, population.reporters
+    )
+    species_set.species = state["species"]
+    species_set.genome_to_species = state["genome_to_species"]
+    species_set.indexer = count(state["next_species_id"])
+    population.species = species_set
+
+    population.reproduction.genome_indexer = count(state["next_genome_id"])
+    population.reproduction.ancestors = state["ancestors"]
+    if state.get("next_node_id") is not None:
+        config.genome_config.node_indexer = count(state["next_node_id"])
+    population.best_genome = state["best_genome"]
+    random.setstate(state["random_state"])
+    return population
+
+
+
+class CheckpointReporter(BaseReporter):
+    """Class for a neat-python reporter saving a checkpoint of the population
+    every few generations. The files are compressed and written by a
+    background thread, one at a time, and only the latest ones are kept.
+    """
+
+    def __init__(self, population, prefix="neat-checkpoint-", interval=1,
+                 keep=3):
+        """Initialize the reporter.
+        Args:
+        - population: the neat.Population being run
+        - prefix: path prefix of the checkpoint files (str)
+        - interval: number of generations between two checkpoints (int)
+        - keep: number of latest checkpoints kept on disk, or None to keep
+        all of them (int)
+        """
+        self.population = population
+        self.prefix = prefix
+        self.interval = interval
+        self.keep = keep
+        self.generation = None
+        # Create the folder of the checkpoint files if needed
+        folder = os.path.dirname(prefix)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # Single background thread writing the checkpoints in order
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+
+    def start_generation(self, generation):
+        """Record the generation number."""
+        self.generation = generation
+
+
+    def end_generation(self, config, population, species_set):
+        """Save a checkpoint if one is due after this generation."""
+        if (self.generation + 1) % self.interval == 0:
+            self.save()
+
+
+    def save(self):
+        """Method to capture the state of the population now, and write it
+        in the background.
+        """
+        data = capture_state(self.population)
+        path = checkpoint_path(self.prefix, self.generation + 1)
+        # Raise the error of the previous write, if it failed
+        self.wait()
+        self.pending = self.executor.submit(self._write, path, data)
+
+
+    def _write(self, path, data):
+        """Write a checkpoint file and delete the oldest ones (runs in the
+        background thread).
+        """
+        write_checkpoint(path, data)
+        if self.keep:
+            old_checkpoints = list_checkpoints(self.prefix)[:-self.keep]
+            for generation, old_path in old_checkpoints:
+                os.remove(old_path)
+
+
+    def wait(self):
+        """Method to wait until the last checkpoint has been written."""
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            pending.result()
+
+
+    def close(self):
+        """Method to finish writing the checkpoints and stop the thread."""
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown()
@@ -0,0 +1,188 @@
+import numpy as np
+
+def get_mask(image):
+    """Get the 2D bitmask of a game image for Pixel Perfect Collision. The
+    game only uses a handful of images (three bird frames, the top and bottom
+    pipe), so every mask is built once from the sprite table and then shared
+    by all birds and pipes. The returned mask must not be modified.
+    Args:
+    - image: Sprite object of a game image
+    """
+    return image.mask
+
+
+def rects_overlap(x1, y1, w1, h1, x2, y2, w2, h2):
+    """Cheap bounding box test: check if two rectangles, given by their top
+    left corner and size, overlap. Two masks can only overlap if their
+    rectangles do.
+    """
+    return x1 < x2 + w2 and x2 < x1 + w1 and y1 < y2 + h2 and y2 < y1 + h1
+
+
+def in_pipe_column(bird_x, bird_w, pipe):
+    """Broad phase of the collision test: check if a bird, given by its
+    position and width on x-axis, is level with the column of a pipe. A bird
+    can only collide with a pipe it is level with, whatever its y position.
+    """
+    offset_x = pipe.x - bird_x
+    return offset_x < bird_w and -offset_x < pipe.WIDTH
+
+
+def collide_pipe(bird_mask, bird_x, bird_y, pipe):
+    """Detect Pixel Perfect Collision between a bird, given by its mask and
+    position, and both parts of a pipe. The bird is first tested against the
+    bounding boxes of the top and bottom pipes, and the masks are only
+    compared for the parts whose boxes overlap the bird's box.
+    Args:
+    - bird_mask: 2D bitmask of the bird's current image
+    - bird_x: position of the bird on x-axis
+    - bird_y: position of the bird on y-axis
+    - pipe: an object of PIPE
+    """
+    # The masks are compared at the bird's rounded position
+    bird_y = round(bird_y)
+    bird_w, bird_h = bird_mask.get_size()
+    top_mask = get_mask(pipe.TOP_IMG)
+    bottom_mask = get_mask(pipe.BOTTOM_IMG)
+
+    # Calculate the offsets of the pipes relative to the bird, as used by ...
+    # ...mask.overlap(other, offset)
+    offset_x = pipe.x - bird_x
+    top_offset_y = pipe.top_y - bird_y
+    bottom_offset_y = pipe.bottom_y - bird_y
+
+    # Broad phase: the bird is not level with the pipe column at all
+    if not in_pipe_column(bird_x, bird_w, pipe):
+        return False
+
+    # Narrow phase: compare the masks of the parts the bird's box touches
+    top_w, top_h = top_mask.get_size()
+    if rects_overlap(
+        0, 0, bird_w, bird_h, offset_x, top_offset_y, top_w, top_h
+    ) and bird_mask.overlap(top_mask, (offset_x, top_offset_y)) is not None:
+        return True
+    bottom_w, bottom_h = bottom_mask.get_size()
+    if rects_overlap(
+        0, 0, bird_w, bird_h, offset_x, bottom_offset_y, bottom_w, bottom_h
+    ) and bird_mask.overlap(
+        bottom_mask, (offset_x, bottom_offset_y)
+    ) is not None:
+        return True
+    return False
+
+
+
+def column_runs(mask):
+    """Get the runs of set bits of every column of a 2D bitmask, as a list
+    with one list of (first y, last y) tuples per column.
+    Args:
+    - mask: pygame mask object
+    """
+    width, height = mask.get_size()
+    columns = []
+    for x in range(width):
+        runs = []
+        y = 0
+        while y < height:
+            if mask.get_at((x, y)):
+                start = y
+                while y < height and mask.get_at((x, y)):
+                    y += 1
+                runs.append((start, y - 1))
+            else:
+                y += 1
+        columns.append(runs)
+    return columns
+
+
+
+class CollisionProfiles:
+    """Class for collision tests between birds and pipes that give the same
+    results as collide_pipe(), without comparing masks. The bird's collision
+    mask is the one of its current (unrotated) image, so its tilt plays no
+    part, and a pipe part (top or bottom) is a fixed mask: whether the two
+    overlap only depends on the bird's image, and on the offsets (x, y) of
+    the pipe part relative to the bird.
+
+    The column profiles of the masks (the runs of set bits of each column)
+    give, for every bird image and x offset, the y offsets at which some
+    column of the bird overlaps the same column of the pipe part:
+    bird rows [t, b] and pipe rows [A, B] overlap when t - B <= dy <= b - A.
+    These are precomputed once as boolean tables, so that a test is a single
+    table lookup, and a whole population is tested in one array operation.
+    """
+
+    def __init__(self, bird_masks, top_mask, bottom_mask):
+        """Initialize the tables.
+        Args:
+        - bird_masks: masks of the bird images, indexed by image (list)
+        - top_mask: mask of the top pipe
+        - bottom_mask: mask of the bottom pipe
+        """
+        self.bird_w, self.bird_h = bird_masks[0].get_size()
+        self.pipe_w, self.pipe_h = top_mask.get_size()
+        # Range of the y offsets (pipe part relative to bird) that can overlap
+        self.dy_min = -(self.pipe_h - 1)
+        self.num_dy = self.bird_h + self.pipe_h - 1
+        bird_profiles = [column_runs(mask) for mask in bird_masks]
+        self.top_table = self._build_table(
+            bird_profiles, column_runs(top_mask)
+        )
+        self.bottom_table = self._build_table(
+            bird_profiles, column_runs(bottom_mask)
+        )
+
+
+    def _build_table(self, bird_profiles, pipe_profile):
+        """Build the table of a pipe part: table[image, x offset + pipe
+        width - 1, y offset - dy_min] is True if the masks overlap.
+        """
+        num_dx = self.bird_w + self.pipe_w - 1
+        # Count, for every y offset, the overlapping intervals starting ...
+        # ...and ending there, and sum them up afterwards
+        counts = np.zeros(
+            (len(bird_profiles), num_dx, self.num_dy + 1), dtype=np.int32
+        )
+        for image, bird_profile in enumerate(bird_profiles):
+            for c, bird_runs in enumerate(bird_profile):
+                for pc, pipe_runs in enumerate(pipe_profile):
+                    # Column c of the bird meets column pc of the pipe part ...
+                    # ...when the pipe is at x offset c - pc
+                    dx = c - pc + self.pipe_w - 1
+                    for t, b in bird_runs:
+                        for a, e in pipe_runs:
+                            counts[image, dx, t - e - self.dy_min] += 1
+                            counts[image, dx, b - a - self.dy_min + 1] -= 1
+        return np.cumsum(counts, axis=2)[:, :, :-1] > 0
+
+
+    def collide(self, images, bird_x, bird_y, pipe_x, top_y, bottom_y):
+        """Detect collisions between birds and a pipe, like collide_pipe()
+        does for each bird. Returns a boolean array, one per bird.
+        Args:
+        - images: index of the current image of each bird (int array)
+        - bird_x: position of the birds on x-axis, shared by all (int)
+        - bird_y: position of each bird on y-axis (float array)
+        - pipe_x: position of the pipe on x-axis (int)
+        - top_y: y position of the top pipe, shared or one per bird
+        - bottom_y: y position of the bottom pipe, shared or one per bird
+        """
+        images = np.asarray(images)
+        hits = np.zeros(len(images), dtype=bool)
+        # Broad phase: the birds are all level with the pipe column or not
+        offset_x = pipe_x - bird_x
+        if not (offset_x < self.bird_w and -offset_x < self.pipe_w):
+            return hits
+        dx = offset_x + self.pipe_w - 1
+        # The masks are compared at the birds' rounded positions (like ...
+        # ...round(), np.rint rounds halves to even)
+        bird_y = np.rint(np.asarray(bird_y, dtype=np.float64)).astype(np.int64)
+        for table, part_y in (
+            (self.top_table, top_y), (self.bottom_table, bottom_y)
+        ):
+            dy = part_y - bird_y - self.dy_min
+            inside = (dy >= 0) & (dy < self.num_dy)
+            hits |= inside & table[
+                images, dx, np.clip(dy, 0, self.num_dy - 1)
+            ]
+        return hits
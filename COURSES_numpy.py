@@ -0,0 +1,165 @@
+import configparser
+import numpy as np
+from BASE_PIPE_pygame import PipeSchedule
+
+
+
+"""
+Multi-course fitness: every genome of a generation flies K seeded courses,
+and its fitness aggregates its K results (mean, min or a quantile), so a bird
+that was only lucky on one course is not promoted.
+
+The K courses are simulated in one batched pass of the "numpy" engine, on a
+grid of K x B rows of a BirdPopulation: row r is the bird of genome r % B on
+course r // B. The courses only differ by the heights of their pipes: the
+pipes move and are passed at the same frames on every course, so a single
+list of pipes drives the whole grid, and each row reads the heights of the
+pipes in its own course. The frame loop, the network activation and the
+pipe updates therefore run once per frame, whatever the number of courses.
+
+The mode is configured in the [MultiCourse] section of the NEAT config file:
+    # Number of courses flown by every genome (1 disables the mode)
+    courses     = 4
+    # Aggregation of the fitness scores: mean, min or quantile
+    aggregation = mean
+    # Quantile of the fitness scores, with aggregation = quantile
+    quantile    = 0.25
+
+The first course of a generation is its usual course, and the others have
+seeds derived from it, so a seeded run stays reproducible and every shard of
+a parallel generation flies the same K courses.
+"""
+
+
+# Aggregations of the K fitness scores of a genome
+AGGREGATIONS = ("mean", "min", "quantile")
+
+
+
+class MultiCourse:
+    """Class for the settings of multi-course fitness: the number of courses
+    and how the fitness scores are aggregated.
+    """
+
+    # Section of the NEAT config file holding the settings
+    SECTION = "MultiCourse"
+
+    def __init__(self, courses=4, aggregation="mean", quantile=0.25):
+        """Initialize the settings.
+        Args:
+        - courses: number of courses flown by every genome (int)
+        - aggregation: aggregation of the fitness scores, one of
+        AGGREGATIONS (str)
+        - quantile: quantile used by the "quantile" aggregation (float)
+        """
+        if courses < 1:
+            raise ValueError("courses must be at least 1")
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(
+                "Unknown aggregation {!r}, expected one of {}".format(
+                    aggregation, AGGREGATIONS
+                )
+            )
+        if not 0 <= quantile <= 1:
+            raise ValueError("quantile must be in [0, 1]")
+        self.courses = courses
+        self.aggregation = aggregation
+        self.quantile = quantile
+
+
+    @classmethod
+    def from_config_file(cls, config_path):
+        """Read the settings from the NEAT config file, or return None if the
+        file has no [MultiCourse] section or uses a single course.
+        Args:
+        - config_path: The path to the configuration file.
+        """
+        parser = configparser.ConfigParser()
+        parser.read(config_path)
+        if not parser.has_section(cls.SECTION):
+            return None
+        section = parser[cls.SECTION]
+        settings = cls(
+            courses=section.getint("courses", fallback=1),
+            aggregation=section.get("aggregation", fallback="mean"),
+            quantile=section.getfloat("quantile", fallback=0.25),
+        )
+        return settings if settings.courses > 1 else None
+
+
+    def course_seeds(self, seed):
+        """Get the seeds of the courses of a generation.
+        Args:
+        - seed: seed of the usual course of the generation (int)
+        """
+        return [seed] + [
+            PipeSchedule.generation_seed(seed, "course{}".format(k))
+            for k in range(1, self.courses)
+        ]
+
+
+    def aggregate(self, fitness):
+        """Aggregate the fitness scores of every genome over its courses.
+        Args:
+        - fitness: array of shape (courses, num_genomes)
+        Returns an array of shape (num_genomes,).
+        """
+        if self.aggregation == "min":
+            return fitness.min(axis=0)
+        if self.aggregation == "quantile":
+            return np.quantile(fitness, self.quantile, axis=0)
+        return fitness.mean(axis=0)
+
+
+
+class CourseGrid:
+    """Class for the K courses of a generation, giving the heights of a pipe
+    on every course to the rows of a (course x bird) grid.
+    """
+
+    def __init__(self, seeds, num_birds):
+        """Initialize the grid.
+        Args:
+        - seeds: seeds of the courses (list of int)
+        - num_birds: number of birds (genomes) per course (int)
+        """
+        self.seeds = seeds
+        self.schedules = [PipeSchedule(seed) for seed in seeds]
+        self.num_birds = num_birds
+        # Top pipe heights of the pipes on every course, by pipe index
+        self._heights = {}
+
+
+    def __len__(self):
+        """Return the number of courses."""
+        return len(self.schedules)
+
+
+    def heights(self, index):
+        """Get the top pipe heights of a pipe on every course.
+        Args:
+        - index: index of the pipe in the courses (int)
+        """
+        heights = self._heights.get(index)
+        if heights is None:
+            heights = self._heights[index] = np.array(
+                [schedule[index] for schedule in self.schedules],
+                dtype=np.int64,
+            )
+        return heights
+
+
+    def courses_of(self, ids):
+        """Get the course of each of the given rows of the grid.
+        Args:
+        - ids: row indices of the grid
+        """
+        return ids // self.num_birds
+
+
+    def genomes_of(self, ids):
+        """Get the genome index of each of the given rows of the grid.
+        Args:
+        - ids: row indices of the grid
+        """
+        return ids % self.num_birds
@@ -0,0 +1,339 @@
+import math
+import struct
+import argparse
+import numpy as np
+
+
+
+"""
+Compiled export of a genome, for fast standalone inference. The winner is
+saved as a pickled neat.DefaultGenome, which needs neat-python and the config
+file to be loaded, and FeedForwardNetwork.create() to be turned into a
+network. A compiled network only needs NumPy: it is a small versioned binary
+file of flat arrays, loaded in microseconds.
+
+File format (little-endian): the MAGIC bytes, a header with the number of
+inputs, outputs, nodes and connections, then:
+- the value slot of each node, in evaluation order (int32): the inputs have
+  the slots 0 to num_inputs - 1, the outputs the next ones, and the hidden
+  nodes the last ones
+- the activation function of each node, as an index in ACTIVATIONS (int32)
+- the number of incoming connections of each node (int32)
+- the bias and the response of each node (float64)
+- the source slot and the weight of each connection, grouped by node in the
+  same order as FeedForwardNetwork (int32 and float64)
+
+The arrays are turned into two straight-line functions, one statement per
+node: one activating the network on a single state with plain Python floats,
+with exactly the maths of FeedForwardNetwork.activate(), and one activating
+it on a batch of states with NumPy columns. Loading a file only reads its
+arrays: each function is generated the first time it is called, and shared
+by all the networks loaded from the same file.
+
+Usage:
+    python EXPORT_numpy.py winner.pkl winner.net
+"""
+
+
+# First bytes of every compiled network, with the version of the format
+MAGIC = b"NEATNET1"
+# Header: number of inputs, outputs, nodes and connections
+HEADER = struct.Struct("<IIII")
+# Supported activation functions, in the order of their indices
+ACTIVATIONS = ("tanh", "sigmoid", "relu", "identity")
+# Expressions of the activation functions of a weighted sum z, on a single
+# state (same maths as neat.activations) and on a batch of states
+SCALAR_ACTIVATIONS = {
+    "tanh": "tanh(max(-60.0, min(60.0, 2.5 * z)))",
+    "sigmoid": "1.0 / (1.0 + exp(-max(-60.0, min(60.0, 5.0 * z))))",
+    "relu": "z if z > 0.0 else 0.0",
+    "identity": "z",
+}
+BATCH_ACTIVATIONS = {
+    "tanh": "tanh(clip(2.5 * z, -60.0, 60.0))",
+    "sigmoid": "1.0 / (1.0 + exp(-clip(5.0 * z, -60.0, 60.0)))",
+    "relu": "where(z > 0.0, z, 0.0)",
+    "identity": "z",
+}
+# Generated activation functions, by source code
+_FUNCTIONS = {}
+
+
+
+class CompiledNetwork:
+    """Class for a feed-forward network compiled from a genome, activated
+    by generated straight-line code instead of a graph walk.
+    """
+
+    def __init__(self, num_inputs, num_outputs, node_slots, activations,
+                 fan_in, biases, responses, link_sources, link_weights):
+        """Initialize the network from its arrays (see the file format).
+        Args:
+        - num_inputs, num_outputs: number of inputs and outputs (int)
+        - node_slots, activations, fan_in: one int per node (arrays)
+        - biases, responses: one float per node (arrays)
+        - link_sources, link_weights: one int and float per connection
+        (arrays)
+        """
+        self.num_inputs = num_inputs
+        self.num_outputs = num_outputs
+        self.node_slots = node_slots
+        self.activations = activations
+        self.fan_in = fan_in
+        self.biases = biases
+        self.responses = responses
+        self.link_sources = link_sources
+        self.link_weights = link_weights
+        # Batch activation function, generated on first use
+        self._activate_batch = None
+
+
+    @classmethod
+    def from_genome(cls, genome, config):
+        """Compile a genome, with the same layers and connection order as
+        FeedForwardNetwork.create().
+        Args:
+        - genome: a neat.DefaultGenome
+        - config: the neat.config.Config of the genome
+        """
+        # Imported here, so loading a compiled network does not need ...
+        # ...neat-python
+        from neat.graphs import feed_forward_layers
+
+        input_keys = list(config.genome_config.input_keys)
+        output_keys = list(config.genome_config.output_keys)
+        connections = [
+            cg.key for cg in genome.connections.values() if cg.enabled
+        ]
+        layers = feed_forward_layers(input_keys, output_keys, connections)
+        slots = {k: i for i, k in enumerate(input_keys + output_keys)}
+        nodes = []
+        links = []
+        for layer in layers:
+            for node in layer:
+                if node not in slots:
+                    slots[node] = len(slots)
+                ng = genome.nodes[node]
+                if ng.aggregation != "sum":
+                    raise ValueError(
+                        "Unsupported aggregation {!r} of node {} in genome "
+                        "{}".format(ng.aggregation, node, genome.key)
+                    )
+                if ng.activation not in ACTIVATIONS:
+                    raise ValueError(
+                        "Unsupported activation {!r} of node {} in genome "
+                        "{}".format(ng.activation, node, genome.key)
+                    )
+                node_links = [
+                    (slots[inode], genome.connections[(inode, onode)].weight)
+                    for inode, onode in connections if onode == node
+                ]
+                nodes.append((
+                    slots[node], ACTIVATIONS.index(ng.activation),
+                    len(node_links), ng.bias, ng.response,
+                ))
+                links.extend(node_links)
+
+        node_slots, activations, fan_in, biases, responses = (
+            zip(*nodes) if nodes else ((),) * 5
+        )
+        link_sources, link_weights = zip(*links) if links else ((), ())
+        return cls(
+            len(input_keys), len(output_keys),
+            np.array(node_slots, dtype=np.int32),
+            np.array(activations, dtype=np.int32),
+            np.array(fan_in, dtype=np.int32),
+            np.array(biases, dtype=np.float64),
+            np.array(responses, dtype=np.float64),
+            np.array(link_sources, dtype=np.int32),
+            np.array(link_weights, dtype=np.float64),
+        )
+
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a network from the bytes of a compiled network file.
+        Args:
+        - data: content of the file (bytes)
+        """
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a compiled network, or unsupported version")
+        offset = len(MAGIC)
+        num_inputs, num_outputs, num_nodes, num_links = HEADER.unpack_from(
+            data, offset
+        )
+        offset += HEADER.size
+        arrays = []
+        for dtype, count in (
+            ("<i4", num_nodes), ("<i4", num_nodes), ("<i4", num_nodes),
+            ("<f8", num_nodes), ("<f8", num_nodes),
+            ("<i4", num_links), ("<f8", num_links),
+        ):
+            arrays.append(np.frombuffer(data, dtype, count, offset))
+            offset += arrays[-1].nbytes
+        return cls(num_inputs, num_outputs, *arrays)
+
+
+    @classmethod
+    def load(cls, path):
+        """Load a compiled network file.
+        Args:
+        - path: path of the file (str)
+        """
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+    def to_bytes(self):
+        """Return the content of the compiled network file (bytes)."""
+        return b"".join((
+            MAGIC,
+            HEADER.pack(
+                self.num_inputs, self.num_outputs, len(self.node_slots),
+                len(self.link_sources),
+            ),
+            self.node_slots.astype("<i4").tobytes(),
+            self.activations.astype("<i4").tobytes(),
+            self.fan_in.astype("<i4").tobytes(),
+            self.biases.astype("<f8").tobytes(),
+            self.responses.astype("<f8").tobytes(),
+            self.link_sources.astype("<i4").tobytes(),
+            self.link_weights.astype("<f8").tobytes(),
+        ))
+
+
+    def save(self, path):
+        """Method to write the network to a compiled network file.
+        Args:
+        - path: path of the file (str)
+        """
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+
+    def _compile(self, expressions, namespace):
+        """Generate the straight-line function activating the network, with
+        one statement per node and 'v<slot>' variables for the values.
+        Args:
+        - expressions: expressions of the activation functions (dict)
+        - namespace: functions used by the expressions (dict)
+        """
+        batch = expressions is BATCH_ACTIVATIONS
+        # Unpack the inputs, one variable (or column) per input
+        input_names = ["v{}".format(i) for i in range(self.num_inputs)]
+        if batch:
+            lines = [
+                "{} = x[:, {}]".format(name, i)
+                for i, name in enumerate(input_names)
+            ]
+        else:
+            lines = ["{}, = x".format(", ".join(input_names))]
+        # The outputs not connected to the inputs stay at 0
+        outputs = range(self.num_inputs, self.num_inputs + self.num_outputs)
+        computed = set(self.node_slots.tolist())
+        for slot in outputs:
+            if slot not in computed:
+                lines.append("v{} = {}".format(
+                    slot, "zeros(len(x))" if batch else "0.0"
+                ))
+
+        link = 0
+        for slot, activation, fan_in, bias, response in zip(
+            self.node_slots.tolist(), self.activations.tolist(),
+            self.fan_in.tolist(), self.biases.tolist(),
+            self.responses.tolist(),
+        ):
+            # Sum the weighted inputs in the order of neat's aggregation, ...
+            # ...with the floats written exactly (repr round-trips)
+            terms = ["0.0"] + [
+                "v{} * {!r}".format(source, weight)
+                for source, weight in zip(
+                    self.link_sources[link:link + fan_in].tolist(),
+                    self.link_weights[link:link + fan_in].tolist(),
+                )
+            ]
+            link += fan_in
+            lines.append("z = {!r} + {!r} * ({})".format(
+                bias, response, " + ".join(terms)
+            ))
+            lines.append("v{} = {}".format(
+                slot, expressions[ACTIVATIONS[activation]]
+            ))
+
+        output_names = ", ".join("v{}".format(slot) for slot in outputs)
+        if batch:
+            lines.append("return stack(({},))".format(output_names))
+        else:
+            lines.append("return [{}]".format(output_names))
+        source = "def activate(x):\n" + "".join(
+            "    " + line + "\n" for line in lines
+        )
+        function = _FUNCTIONS.get(source)
+        if function is None:
+            exec(source, namespace)
+            function = _FUNCTIONS[source] = namespace["activate"]
+        return function
+
+
+    def activate(self, inputs):
+        """Method to activate the network on a single state. Returns the
+        list of output values, like FeedForwardNetwork.activate().
+        Args:
+        - inputs: the input values (sequence of float)
+        """
+        # Generate the function, and call it directly from now on
+        self.activate = self._compile(SCALAR_ACTIVATIONS, {
+            "tanh": math.tanh, "exp": math.exp,
+        })
+        return self.activate(inputs)
+
+
+    def activate_batch(self, inputs):
+        """Method to activate the network on a batch of states. Returns an
+        array of shape (len(inputs), num_outputs).
+        Args:
+        - inputs: array of shape (n, num_inputs), one row per state
+        """
+        inputs = np.asarray(inputs, dtype=np.float64)
+        if inputs.ndim != 2 or inputs.shape[1] != self.num_inputs:
+            raise RuntimeError(
+                "Expected inputs of shape (n, {}), got {}".format(
+                    self.num_inputs, inputs.shape
+                )
+            )
+        if self._activate_batch is None:
+            self._activate_batch = self._compile(BATCH_ACTIVATIONS, {
+                "tanh": np.tanh, "exp": np.exp, "clip": np.clip,
+                "where": np.where, "zeros": np.zeros,
+                "stack": np.column_stack,
+            })
+        return self._activate_batch(inputs)
+
+
+
+# Compile a pickled genome when this script is run directly
+if __name__ == "__main__":
+    import pickle
+    import neat
+
+    parser = argparse.ArgumentParser(
+        description="Compile a pickled genome into a standalone network."
+    )
+    parser.add_argument("genome", help="path of the pickled genome")
+    parser.add_argument("output", help="path of the compiled network")
+    parser.add_argument(
+        "--config", default="./config-feedforward.txt",
+        help="path to the NEAT configuration file",
+    )
+    args = parser.parse_args()
+
+    config = neat.config.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        args.config,
+    )
+    with open(args.genome, "rb") as f:
+        genome = pickle.load(f)
+    CompiledNetwork.from_genome(genome, config).save(args.output)
@@ -0,0 +1,513 @@
+import os
+import re
+import pickle
+import random
+import argparse
+import tempfile
+import itertools
+import traceback
+import multiprocessing
+from itertools import count
+from BASE_PIPE_pygame import PipeSchedule
+from CHECKPOINT_neat import (
+    capture_state, checkpoint_path, list_checkpoints, read_checkpoint,
+    write_checkpoint,
+)
+
+
+
+"""
+Island-model evolution: several independent populations (islands) evolve in
+separate processes, each on its own course seeds, so they explore different
+solutions instead of all converging on the same one. Every few generations
+(an epoch), each island sends copies of its fittest genomes to the next
+island of a ring, where they replace the youngest genomes of the population.
+
+Imported genomes have to stay valid in the population they join:
+- neat-python identifies connections by their (input node, output node)
+  keys, not by innovation numbers, so connection genes only clash if their
+  node ids do. Each island therefore allocates the ids of its new hidden
+  nodes in its own range of NODE_ID_RANGE ids, so a node created on one
+  island never gets the id of another node on another island, and the genes
+  of a migrant line up with those of the genomes it shares ancestors with.
+- genome keys are only unique within an island, so a migrant gets a new key
+  from the island it joins, and the population is divided into species
+  again before the next generation.
+
+An IslandCoordinator starts the island processes, runs the epochs and
+prints the progress of every island after each of them, and stops as soon
+as an island reaches the fitness threshold. With a checkpoint prefix, every
+island is checkpointed at the end of each epoch, together with a manifest
+holding the migrants in transit, so an interrupted run carries on where it
+stopped. The winner is the fittest genome of all islands.
+
+Usage:
+    python Main.py --islands 4 --migrate-every 5 --migrants 2 --seed 42
+    python ISLANDS_multiprocessing.py --islands 4 --generations 50
+"""
+
+
+# Number of node ids reserved for the new nodes of each island
+NODE_ID_RANGE = 10**6
+# Name of the manifest of an island run, after the checkpoint prefix
+MANIFEST = "islands.ckpt"
+
+
+def island_seed(seed, index):
+    """Derive the seed of an island from the seed of the run, so every island
+    flies its own reproducible courses (None if the run is not seeded).
+    Args:
+    - seed: seed of the run (int)
+    - index: index of the island (int)
+    """
+    if seed is None:
+        return None
+    return PipeSchedule.generation_seed(seed, "island{}".format(index))
+
+
+def reserve_node_ids(genome_config, index, genomes):
+    """Make the genome config of an island allocate the ids of new nodes in
+    the island's own range, after the ids already used in that range.
+    Args:
+    - genome_config: the neat.DefaultGenomeConfig of the island
+    - index: index of the island (int)
+    - genomes: the genomes of the island (iterable of neat.DefaultGenome)
+    """
+    first = max(genome_config.output_keys) + 1 + index * NODE_ID_RANGE
+    used = [
+        key for genome in genomes for key in genome.nodes
+        if first <= key < first + NODE_ID_RANGE
+    ]
+    genome_config.node_indexer = count(max(used) + 1 if used else first)
+
+
+def import_migrants(population, migrants):
+    """Replace the youngest genomes of a population with migrants, and
+    divide the population into species again.
+    Args:
+    - population: the neat.Population of the island
+    - migrants: genomes of other islands (list of neat.DefaultGenome)
+    """
+    if not migrants:
+        return
+    reproduction = population.reproduction
+    # The youngest genomes have the highest keys, the elites the lowest
+    for key in sorted(population.population)[-len(migrants):]:
+        del population.population[key]
+        reproduction.ancestors.pop(key, None)
+    for genome in migrants:
+        genome.key = next(reproduction.genome_indexer)
+        genome.fitness = None
+        population.population[genome.key] = genome
+        reproduction.ancestors[genome.key] = ()
+    population.species.speciate(
+        population.config, population.population, population.generation
+    )
+
+
+def _create_island(index, config_path, engine, seed, resume):
+    """Create the headless NEAT app of an island, allocating the ids of its
+    new nodes in its own range.
+    Args:
+    - index: index of the island (int)
+    - config_path: The path to the configuration file.
+    - engine: The engine simulating the birds (str)
+    - seed: seed of the island, or None for random courses (int)
+    - resume: path of a checkpoint of the island to carry on from (str)
+    """
+    # Imported here, as Main.py imports this module
+    from Main import NeatApp
+    if seed is not None and resume is None:
+        random.seed(seed)
+    app = NeatApp(
+        config_path, headless=True, engine=engine, seed=seed, resume=resume
+    )
+    # neat already creates the node indexer with the first population ...
+    # ...when it has hidden nodes, so a new island always restarts it in ...
+    # ...its own range. A checkpoint holds the island's next node id, ...
+    # ...once nodes have been added
+    genome_config = app.config.genome_config
+    if resume is None or genome_config.node_indexer is None:
+        reserve_node_ids(genome_config, index, app.p.population.values())
+    return app
+
+
+def _run_island(conn, index, config_path, engine, seed, num_migrants,
+                resume):
+    """Run an island in its own process, executing the commands of the
+    coordinator received on the pipe until told to stop:
+    - ("evolve", (generations, migrants)): import the migrants and evolve
+      the island for up to that many generations
+    - ("checkpoint", path): checkpoint the island to that path
+    - ("stop", None)
+    Each command is answered with ("ok", result) or ("error", traceback).
+    Args:
+    - conn: end of the pipe to the coordinator
+    - index: index of the island (int)
+    - config_path: The path to the configuration file.
+    - engine: The engine simulating the birds (str)
+    - seed: seed of the island, or None for random courses (int)
+    - num_migrants: number of genomes the island sends per epoch (int)
+    - resume: path of a checkpoint of the island to carry on from (str)
+    """
+    try:
+        app = _create_island(index, config_path, engine, seed, resume)
+        population = app.p
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+
+    # The fittest genomes of the last evaluated generation
+    top = []
+
+    def evaluate(genomes, config):
+        app.eval_genomes(genomes, config)
+        top[:] = sorted(
+            (g for g_id, g in genomes), key=lambda g: g.fitness,
+            reverse=True,
+        )[:num_migrants]
+
+    while True:
+        command, args = conn.recv()
+        if command == "stop":
+            break
+        try:
+            if command == "evolve":
+                generations, migrants = args
+                import_migrants(population, migrants)
+                best = population.run(evaluate, generations)
+                result = {
+                    "generation": population.generation,
+                    "best_genome": best,
+                    "species": len(population.species.species),
+                    "score": app.score,
+                    "top": top,
+                    "solved": best.fitness >= app.config.fitness_threshold,
+                }
+            elif command == "checkpoint":
+                write_checkpoint(
+                    args, capture_state(population, population.generation)
+                )
+                result = args
+            else:
+                raise ValueError("Unknown command {!r}".format(command))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+        else:
+            conn.send(("ok", result))
+    conn.close()
+
+
+
+class IslandCoordinator:
+    """Class for evolving islands of genomes in separate processes, with
+    ring migration of their fittest genomes every few generations.
+    """
+
+    def __init__(self, config_path, num_islands=4, migration_interval=5,
+                 num_migrants=2, engine="objects", seed=None,
+                 checkpoint_prefix=None, resume=None, keep=2):
+        """Initialize the coordinator and start the island processes.
+        Args:
+        - config_path: The path to the configuration file.
+        - num_islands: Number of islands, one process each (int)
+        - migration_interval: Number of generations between two migrations
+        (int)
+        - num_migrants: Number of genomes each island sends to the next one
+        at every migration (int)
+        - engine: The engine simulating the birds (str)
+        - seed: The seed of the run, from which every island gets its own
+        courses. If None, the courses are random (int)
+        - checkpoint_prefix: If given, the islands are checkpointed at the
+        end of every epoch to files starting with this prefix (str)
+        - resume: Path of the manifest of an island run to resume, or
+        "latest" for the one with checkpoint_prefix (str)
+        - keep: Number of checkpoints kept per island (int)
+        """
+        if num_islands < 2:
+            raise ValueError("An island run needs at least 2 islands")
+        if migration_interval < 1:
+            raise ValueError("migration_interval must be at least 1")
+        self.config_path = config_path
+        self.migration_interval = migration_interval
+        self.num_migrants = num_migrants
+        self.checkpoint_prefix = checkpoint_prefix
+        self.keep = keep
+        # Generations evolved by every island, migrants waiting to be ...
+        # ...imported by each island, and the fittest genome so far
+        self.generation = 0
+        self.migrants = [[] for _ in range(num_islands)]
+        self.best_genome = None
+        # Statistics of every island after each epoch
+        self.history = []
+
+        resume_paths = [None] * num_islands
+        if resume is not None:
+            if resume == "latest":
+                if not checkpoint_prefix:
+                    raise ValueError(
+                        "Resuming the latest island run needs a checkpoint "
+                        "prefix"
+                    )
+                resume = checkpoint_prefix + MANIFEST
+            manifest = read_checkpoint(resume)
+            if len(manifest["islands"]) != num_islands:
+                raise ValueError(
+                    "{} holds {} islands, not {}".format(
+                        resume, len(manifest["islands"]), num_islands
+                    )
+                )
+            resume_paths = manifest["islands"]
+            self.generation = manifest["generation"]
+            self.migrants = manifest["migrants"]
+            self.best_genome = manifest["best_genome"]
+            seed = manifest["seed"]
+            print("Resuming {} islands from {} at generation {}".format(
+                num_islands, resume, self.generation
+            ))
+        self.seed = seed
+
+        # Spawned processes do not inherit the pygame state of this one
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for index in range(num_islands):
+            conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_run_island,
+                args=(
+                    child_conn, index, config_path, engine,
+                    island_seed(seed, index), num_migrants,
+                    resume_paths[index],
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self.connections.append(conn)
+            self.processes.append(process)
+
+
+    def _command(self, command, args):
+        """Send a command to every island, one argument per island, and
+        return their results once they have all answered.
+        """
+        for conn, arg in zip(self.connections, args):
+            conn.send((command, arg))
+        results = []
+        errors = []
+        for index, conn in enumerate(self.connections):
+            try:
+                status, result = conn.recv()
+            except EOFError:
+                status, result = "error", "the process exited\n"
+            if status == "error":
+                errors.append("Island {}: {}".format(index, result))
+            results.append(result)
+        if errors:
+            raise RuntimeError("".join(errors))
+        return results
+
+
+    def run(self, num_generations):
+        """Method to evolve the islands up to a number of generations, or
+        until one of them reaches the fitness threshold, and return the
+        fittest genome of all islands.
+        Args:
+        - num_generations: total number of generations of every island,
+        including those of a resumed run (int)
+        """
+        while self.generation < num_generations:
+            generations = min(
+                self.migration_interval, num_generations - self.generation
+            )
+            results = self._command("evolve", [
+                (generations, migrants) for migrants in self.migrants
+            ])
+            self.generation += generations
+            for result in results:
+                best = result["best_genome"]
+                if (self.best_genome is None
+                        or best.fitness > self.best_genome.fitness):
+                    self.best_genome = best
+            self.history.append([
+                {key: value for key, value in result.items() if key != "top"}
+                for result in results
+            ])
+            self.report(results)
+            if any(result["solved"] for result in results):
+                break
+
+            # Ring migration: each island sends its fittest genomes to ...
+            # ...the next one, imported before its next generation
+            self.migrants = [
+                results[index - 1]["top"] for index in range(len(results))
+            ]
+            if self.checkpoint_prefix:
+                self.checkpoint()
+        return self.best_genome
+
+
+    def report(self, results):
+        """Method to print the progress of every island after an epoch."""
+        print("\n ****** Islands at generation {} ******".format(
+            self.generation
+        ))
+        for index, result in enumerate(results):
+            print("Island {}: best fitness {:.1f}, {} species, score {}{}"
+                  .format(
+                      index, result["best_genome"].fitness,
+                      result["species"], result["score"],
+                      " (solved)" if result["solved"] else "",
+                  ))
+        print("Global best fitness: {:.1f}".format(self.best_genome.fitness))
+
+
+    def checkpoint(self):
+        """Method to checkpoint every island, then the manifest of the run,
+        and to remove the oldest checkpoints of the islands.
+        """
+        prefixes = [
+            "{}island{}-".format(self.checkpoint_prefix, index)
+            for index in range(len(self.processes))
+        ]
+        paths = self._command("checkpoint", [
+            checkpoint_path(prefix, self.generation) for prefix in prefixes
+        ])
+        # The manifest only points to complete island checkpoints
+        write_checkpoint(self.checkpoint_prefix + MANIFEST, pickle.dumps({
+            "generation": self.generation,
+            "islands": paths,
+            "migrants": self.migrants,
+            "best_genome": self.best_genome,
+            "seed": self.seed,
+        }, protocol=pickle.HIGHEST_PROTOCOL))
+        for prefix in prefixes:
+            for generation, path in list_checkpoints(prefix)[:-self.keep]:
+                os.remove(path)
+
+
+    def close(self):
+        """Method to stop the island processes."""
+        for conn, process in zip(self.connections, self.processes):
+            if process.is_alive():
+                try:
+                    conn.send(("stop", None))
+                except (BrokenPipeError, OSError):
+                    pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+
+
+
+def test_island_node_ids(config_path="./config-feedforward.txt",
+                         num_islands=3):
+    """Function for testing that islands starting with hidden nodes give
+    their new nodes ids from disjoint ranges
+    """
+    # A copy of the config whose genomes start with hidden nodes, ...
+    # ...for which neat creates the node indexer itself
+    with open(config_path) as f:
+        text = re.sub(r"num_hidden\s*=\s*\d+", "num_hidden = 2", f.read())
+    text = re.sub(
+        r"initial_connection\s*=\s*\w+", "initial_connection = full_direct",
+        text,
+    )
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", delete=False
+    ) as f:
+        f.write(text)
+    try:
+        new_ids = []
+        for index in range(num_islands):
+            app = _create_island(index, f.name, "numpy", index, None)
+            genome_config = app.config.genome_config
+            # The initial hidden nodes have the same ids on every island, ...
+            # ...like the initial connections
+            genomes = app.p.population.values()
+            initial = {key for genome in genomes for key in genome.nodes}
+            # Add a node to every genome, splitting one of its connections
+            ids = set()
+            for genome in genomes:
+                genome.mutate_add_node(genome_config)
+                ids.update(set(genome.nodes) - initial)
+            first = max(genome_config.output_keys) + 1 + index * NODE_ID_RANGE
+            assert ids and all(
+                first <= key < first + NODE_ID_RANGE for key in ids
+            ), "Island {} gave ids out of its range".format(index)
+            new_ids.append(ids)
+        for i, j in itertools.combinations(range(num_islands), 2):
+            assert not new_ids[i] & new_ids[j], (
+                "Islands {} and {} gave the same node ids".format(i, j)
+            )
+        print("The new nodes of {} islands have disjoint ids".format(
+            num_islands
+        ))
+    finally:
+        os.remove(f.name)
+
+
+# Testing the node ids of the islands
+# test_island_node_ids()
+
+
+
+# Run an island evolution when this script is run directly
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evolve islands of birds in parallel, with migration."
+    )
+    parser.add_argument(
+        "--config", default="./config-feedforward.txt",
+        help="path to the NEAT configuration file",
+    )
+    parser.add_argument(
+        "--islands", type=int, default=4, help="number of islands"
+    )
+    parser.add_argument(
+        "--generations", type=int, default=50,
+        help="number of generations of every island",
+    )
+    parser.add_argument(
+        "--migrate-every", type=int, default=5, metavar="N",
+        help="number of generations between two migrations",
+    )
+    parser.add_argument(
+        "--migrants", type=int, default=2,
+        help="number of genomes each island sends at every migration",
+    )
+    parser.add_argument(
+        "--engine", choices=("objects", "numpy"), default="numpy",
+        help="engine simulating the birds",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="seed of the run"
+    )
+    parser.add_argument(
+        "--checkpoint", metavar="PREFIX", default=None,
+        help="checkpoint the islands to files starting with PREFIX",
+    )
+    parser.add_argument(
+        "--resume", metavar="PATH", nargs="?", const="latest", default=None,
+        help="resume the run from an island manifest (default: the one "
+        "with the --checkpoint prefix)",
+    )
+    parser.add_argument(
+        "--output", default="winner.pkl",
+        help="path of the pickled winner genome",
+    )
+    args = parser.parse_args()
+
+    coordinator = IslandCoordinator(
+        args.config, args.islands, args.migrate_every, args.migrants,
+        args.engine, args.seed, args.checkpoint, args.resume,
+    )
+    try:
+        winner = coordinator.run(args.generations)
+    finally:
+        coordinator.close()
+    print("\nBest genome:\n{!s}".format(winner))
+    with open(args.output, "wb") as f:
+        pickle.dump(winner, f)
@@ -1,8 +1,29 @@
-from Bird_pygame import Bird
-from Base_Pipe_pygame import Base, Pipe
+from BIRD_pygame import Bird, Flock
+from BASE_PIPE_pygame import Base, Pipe, PipeSchedule
+from POPULATION_numpy import BirdPopulation
+from NETWORK_numpy import BatchedNetwork
+from PARALLEL_multiprocessing import ParallelEvaluator
+from ISLANDS_multiprocessing import IslandCoordinator
+from ASSETS_pygame import load_image, build_background, TextCache
+from PROFILING_neat import FrameProfiler, PhaseTimingReporter
+from BUDGET_neat import EvaluationBudget, select_stopped
+from COURSES_numpy import MultiCourse, CourseGrid
+from CACHE_neat import FitnessCache, FitnessCacheReporter
+from TELEMETRY_asyncio import TelemetryServer, TelemetryReporter
+from COLLISION_pygame import in_pipe_column
+from RENDERER_pygame import SnapshotRenderer
+from REPLAY_mmap import ReplayRecorder
+from EXPORT_numpy import CompiledNetwork
+from CHECKPOINT_neat import (
+    CheckpointReporter, latest_checkpoint, restore_population
+)
+import numpy as np
 import pygame
 import neat
 import pickle
+import argparse
+import configparser
+import random
 import os
 
 
@@ -52,14 +73,100 @@ class NeatApp:
     FRAMES_PER_SECOND = 30
     # The fitness function eval_genomes() will be called for up to 30 generations
     MAX_GENS = 30
-
-    def __init__(self, config_path):
+    # A round of the game ends once the player's score exceeds 200
+    MAX_SCORE = 200
+    # Set the starting position shared by all birds
+    BIRD_X = 230
+    BIRD_Y = 350
+    # Available engines for simulating the birds of a generation:
+    # - "objects": one BIRD object per genome
+    # - "numpy": a BirdPopulation advancing all birds in batched array ...
+    #   steps, with all neural networks compiled into one BatchedNetwork
+    ENGINES = ("objects", "numpy")
+
+    def __init__(self, config_path, headless=False, engine="objects",
+                 workers=0, seed=None, fixed_course=False,
+                 profile_path=None, checkpoint_prefix=None,
+                 checkpoint_interval=1, resume=None, watch=False,
+                 watch_top_k=None, record_path=None, telemetry_port=None):
         """Initialize the 'NeatApp' object with a given path to the
         configuration file.
         Args:
         - config_path: The path to the configuration file.
+        - headless: If True, the training generations run without a pygame
+        window and without frame rate limit (bool)
+        - engine: The engine simulating the birds, one of ENGINES (str)
+        - workers: If higher than 1, the training generations are split
+        across this many headless worker processes (int)
+        - seed: The seed of the run. Every generation gets a reproducible
+        course derived from it. If None, the courses are random (int)
+        - fixed_course: If True, every generation flies the same course,
+        the one given by the seed (bool)
+        - profile_path: If given, the phases of the frame loop are timed,
+        and written per generation to profile_path + ".jsonl" and ".csv"
+        (str)
+        - checkpoint_prefix: If given, the run is checkpointed to files
+        starting with this path prefix (str)
+        - checkpoint_interval: Number of generations between two
+        checkpoints (int)
+        - resume: Path of a checkpoint file to resume the run from, or
+        "latest" for the latest checkpoint with checkpoint_prefix (str)
+        - watch: If True, the training generations run headless at full
+        speed, and a separate window shows them at FRAMES_PER_SECOND (bool)
+        - watch_top_k: If given, the window only shows the K fittest birds
+        (int)
+        - record_path: If given, the training generations are recorded to
+        this replay log (str)
+        - telemetry_port: If given, the statistics of every generation are
+        streamed as JSON lines on this local TCP port (int)
         """
+        if engine not in self.ENGINES:
+            raise ValueError(
+                "Unknown engine {!r}, expected one of {}".format(
+                    engine, self.ENGINES
+                )
+            )
+        if record_path and workers > 1:
+            raise ValueError(
+                "Replay logs can only be recorded without worker processes"
+            )
+        if watch and workers > 1:
+            # The renderer is sent the snapshots of the main process only
+            raise ValueError(
+                "Training can only be watched without worker processes"
+            )
+        if profile_path and workers > 1:
+            # The phases of the frame loop run in the worker processes
+            raise ValueError(
+                "The frame loop can only be profiled without worker processes"
+            )
         self.config_path = config_path
+        # Whether to run the game simulation without display and clock. ...
+        # ...Watched runs are simulated headless and drawn by a renderer ...
+        # ...process while training
+        self.headless = headless or watch
+        self.watch = watch
+        self.watch_top_k = watch_top_k
+        self.renderer = None
+        # The engine used to simulate the birds of each generation
+        self.engine = engine
+        # Number of worker processes evaluating the training generations
+        self.workers = workers
+        # Seed of the run, and whether all generations share its course
+        self.seed = seed
+        self.fixed_course = fixed_course
+        # Optional profiler timing the phases of the frame loop
+        self.profile_path = profile_path
+        self.profiler = FrameProfiler() if profile_path else None
+        # Where and how often the run is checkpointed
+        self.checkpoint_prefix = checkpoint_prefix
+        self.checkpoint_interval = checkpoint_interval
+        # Optional recorder of the jumps of every bird, for exact replays
+        self.recorder = ReplayRecorder(record_path) if record_path else None
+        # Optional local server streaming the statistics of the run, ...
+        # ...started by run()
+        self.telemetry_port = telemetry_port
+        self.telemetry = None
         # Load the required NEAT config from the config file
         self.config = neat.config.Config(
             neat.DefaultGenome,
@@ -68,38 +175,144 @@ class NeatApp:
             neat.DefaultStagnation,
             self.config_path,
         )
+        # Optional successive-halving budget of the frames of a generation, ...
+        # ...read from the [EvaluationBudget] section of the config file
+        self.budget = EvaluationBudget.from_config_file(self.config_path)
+        if self.budget and workers > 1:
+            # Each shard would cut its own birds at every horizon, so the ...
+            # ...fitness would depend on how the generation is split
+            raise ValueError(
+                "The evaluation budget ranks the birds of the whole "
+                "generation, and cannot be used with worker processes: "
+                "disable [EvaluationBudget] or run without --workers"
+            )
+        # Optional multi-course fitness, read from the [MultiCourse] ...
+        # ...section of the config file, and the (course x bird) grid of ...
+        # ...the generation being evaluated
+        self.multi_course = MultiCourse.from_config_file(self.config_path)
+        self.grid = None
+        # Optional cache of the fitness of the genomes already simulated ...
+        # ...on a course, read from the [FitnessCache] section. A replay ...
+        # ...log needs the jumps of every bird, so recording bypasses it
+        self.fitness_cache = None
+        if not self.recorder:
+            self.fitness_cache = FitnessCache.from_config_file(
+                self.config_path
+            )
+        # Number of frames between two decisions of the networks, read ...
+        # ...from the [DecisionInterval] section of the config file
+        self.decision_interval = self.read_decision_interval(
+            self.config_path
+        )
         # Create a population object that implements the core evolution algorithm:
         # 1. Evaluate the fitness of all genomes
         # 2. Check to see if the termination criterion is satisfied; exit if it is
         # 3. Generate the next generation from the current generation
         # 4. Partition the new generation into species based on genetic similarity
         # 5. Go to 1
-        self.p = neat.Population(self.config)
+        if resume is None:
+            self.p = neat.Population(self.config)
+        else:
+            # Carry on with the population of a checkpoint instead
+            if resume == "latest":
+                if not checkpoint_prefix:
+                    raise ValueError(
+                        "Resuming the latest checkpoint needs a checkpoint "
+                        "prefix"
+                    )
+                resume = latest_checkpoint(checkpoint_prefix)
+                if resume is None:
+                    raise ValueError(
+                        "No checkpoint found with prefix {!r}".format(
+                            checkpoint_prefix
+                        )
+                    )
+            self.p = restore_population(resume, self.config)
+            print("Resuming from {} at generation {}".format(
+                resume, self.p.generation
+            ))
 
-        # Initialize the generation count to 0
-        self.gen_count = 0
+        # Initialize the generation count to the generations already run
+        self.gen_count = self.p.generation
         # Initialize the player's score to 0
         self.score = 0
+        # Frames simulated in the current generation, and number of birds ...
+        # ...alive in each of them (recorded for the telemetry)
+        self.frame_count = 0
+        self.alive_curve = []
+        # Frames in which the score went up, and the flight of every ...
+        # ...simulated genome: (frames, score, frames survived by each of ...
+        # ...its birds), kept in the fitness cache
+        self.score_frames = []
+        self.flights = []
+
+
+    @staticmethod
+    def read_decision_interval(config_path):
+        """Read the number of frames between two decisions of the networks
+        from the [DecisionInterval] section of the config file (1 if the
+        section is missing). In between, the birds repeat their last action
+        (jump or no jump), while their physics and collisions are still
+        updated every frame.
+        Args:
+        - config_path: The path to the configuration file.
+        """
+        parser = configparser.ConfigParser()
+        parser.read(config_path)
+        interval = parser.getint("DecisionInterval", "frames", fallback=1)
+        if interval < 1:
+            raise ValueError("The decision interval must be at least 1 frame")
+        return interval
 
 
     def init_game(self):
         """Method to initialise the game environment and objects required
         to start a new round of game.
         """
-        # Create pygame window object
-        self.win = pygame.display.set_mode((self.WIN_WIDTH, self.WIN_HEIGHT))
+        # The window, font and clock are only needed when the game is drawn
+        if not self.headless:
+            # Create pygame window object
+            self.win = pygame.display.set_mode(
+                (self.WIN_WIDTH, self.WIN_HEIGHT)
+            )
 
-        # Initialise the pygame font module
-        pygame.font.init()
-        # Set the system font for the game
-        self.text_font = pygame.font.SysFont("comicsans", 40)
+            # Initialise the pygame font module
+            pygame.font.init()
+            # Set the system font for the game
+            self.text_font = pygame.font.SysFont("comicsans", 40)
+            # Cache the indicator texts, rendered again only on change
+            self.texts = TextCache(self.text_font)
 
-        # Create pygame clock object to manage the game's frame rate
-        self.clock = pygame.time.Clock()
+            # Pre-render the static background once for the window
+            self.background = build_background(
+                load_image("bg.png"), (self.WIN_WIDTH, self.WIN_HEIGHT)
+            )
+
+            # Create pygame clock object to manage the game's frame rate
+            self.clock = pygame.time.Clock()
 
         # Initialise the 'base' object and 'pipes' list
         self.base = Base(700)
-        self.pipes = [Pipe(700)]
+        self.pipes = [Pipe(700, self.course[0], 0)]
+
+        # Count the frames simulated, and set the first horizon of the ...
+        # ...evaluation budget (if any)
+        self.frame_count = 0
+        if self.budget:
+            self.horizon = self.budget.next_horizon()
+
+
+    def get_upcoming_pipe(self):
+        """Method to get the pipe object that the birds are flying towards or
+        passing through.
+        """
+        # If the birds are between two pipes, take the second pipe, ...
+        # ...otherwise the first one
+        if (len(self.pipes) > 1) and (
+            (self.pipes[0].x + self.pipes[0].WIDTH) < self.BIRD_X
+        ):
+            return self.pipes[1]
+        return self.pipes[0]
 
 
     def evaluate_bird_jump(self, net, bird, upcoming_pipe):
@@ -115,8 +328,10 @@ class NeatApp:
                 abs(bird.y - upcoming_pipe.bottom_y),
             )
         )[0]
-        if output > 0.5:
-            # Make the bird jump if the output value is higher than 0.5
+        # Make the bird jump if the output value is higher than 0.5, and ...
+        # ...hold this action until the next decision
+        bird.jumping = output > 0.5
+        if bird.jumping:
             bird.jump()
 
 
@@ -124,45 +339,87 @@ class NeatApp:
         """Method to identify and eliminate the birds that have collided
         with obstacles in the game, such as pipes, ceiling, or base floor.
         """
-        # Eliminate the birds that have collided with any of the pipes
-        for pipe in self.pipes:
-            # Capture the birds that have collided with either the top ...
-            # ...or bottom pipe
-            birds_to_remove = []
-            for bird in self.birds:
-                if pipe.collide(bird):
-                    birds_to_remove.append(bird)
-            # Remove all the colliding birds from the game
-            self.eliminate_birds(birds_to_remove)
-
-        # Eliminate the birds that have collided with either the ceiling or floor
-        # Capture the colliding birds
+        # Capture the positions of the birds that have collided with ...
+        # ...either the top or bottom pipe of any of the pipes, or with ...
+        # ...either the ceiling or floor
         birds_to_remove = []
-        for bird in self.birds:
+        for i, (g, net, bird) in enumerate(self.birds):
             if (
                 bird.y <= 0 or
-                (bird.y + bird.img.get_height()) >= self.base.y
+                (bird.y + bird.img.get_height()) >= self.base.y or
+                any(pipe.collide(bird) for pipe in self.pipes)
             ):
-                birds_to_remove.append(bird)
+                birds_to_remove.append(i)
         # Remove all the colliding birds from the game
         self.eliminate_birds(birds_to_remove)
 
 
-    def eliminate_birds(self, birds_to_remove):
-        """Method to remove the genomes, neural netowrks, and bird objects of
-        the target birds from the three lists.
+    def eliminate_birds(self, birds_to_remove, crashed=True):
+        """Method to remove the target birds, along with their genomes and
+        neural networks, from the flock of birds alive.
+        Args:
+        - birds_to_remove: positions of the target birds in the flock
+        - crashed: whether the birds crashed in the current frame, rather
+        than being stopped after it (bool)
         """
-        # Check if there are any birds to remove
-        if birds_to_remove:
-            # Iterate through each bird to remove
-            for b in birds_to_remove:
-                # Get the index of the current bird in the 'birds' list
-                b_id = self.birds.index(b)
-                # Remove the genome, neural network, and bird object ...
-                # ...associated with the current bird from the three lists
-                self.gns.pop(b_id)
-                self.nets.pop(b_id)
-                self.birds.pop(b_id)
+        # Record how many frames each bird moved in and survived
+        for i in birds_to_remove:
+            genome = self.birds.members[i][0]
+            self.left[id(genome)] = (
+                self.frame_count + 1 if crashed else self.frame_count,
+                self.frame_count,
+            )
+        # All the dead birds are dropped in a single pass over the flock
+        self.birds.remove(birds_to_remove)
+
+
+    def apply_budget(self):
+        """Method to stop the birds that do not carry on to the next rung of
+        the evaluation budget, once the current horizon has been reached.
+        The stopped birds keep the fitness they have reached.
+        """
+        if self.frame_count < self.horizon:
+            return
+        self.horizon = self.budget.next_horizon(self.horizon)
+        if not self.birds:
+            return
+
+        # Only the birds with the largest safety margin carry on
+        keep = self.budget.keep_count(len(self.birds))
+        upcoming_pipe = self.get_upcoming_pipe()
+        gap_center = (upcoming_pipe.top_height + upcoming_pipe.bottom_y) / 2
+        if isinstance(self.birds, BirdPopulation):
+            ids = self.birds.alive_ids
+            if self.grid:
+                # Each row has the gap of the pipe on its own course
+                gap_center = self.grid.heights(upcoming_pipe.index)[
+                    self.grid.courses_of(ids)
+                ] + Pipe.GAP / 2
+            stopped = select_stopped(
+                self.birds.y[ids], self.birds.IMG_HEIGHT, gap_center, keep
+            )
+            self.birds.kill(ids[stopped], crashed=False)
+        else:
+            stopped = select_stopped(
+                [bird.y for g, net, bird in self.birds],
+                Bird.IMGS[0].get_height(), gap_center, keep,
+            )
+            self.eliminate_birds(stopped.tolist(), crashed=False)
+
+
+    def collide_course_grid(self, pipe):
+        """Method to eliminate the birds of a (course x bird) grid colliding
+        with the pipe at the position of the given pipe on their own course.
+        Args:
+        - pipe: a pipe of the first course
+        """
+        # The pipes are at the same position on every course, so the birds ...
+        # ...of all courses are level with the pipe column at the same frames
+        if not in_pipe_column(self.BIRD_X, Bird.IMGS[0].get_width(), pipe):
+            return
+        ids = self.birds.alive_ids
+        top_height = self.grid.heights(pipe.index)[self.grid.courses_of(ids)]
+        self.birds.kill(self.birds.collide(pipe, ids, top_height))
 
 
     def update_pipes(self):
@@ -183,7 +440,7 @@ class NeatApp:
                 # ...by the birds
                 if (
                     not pipe.passed and
-                    (pipe.x + pipe.WIDTH < self.birds[0].x)
+                    (pipe.x + pipe.WIDTH < self.BIRD_X)
                 ):
                     # If so, mark it as "passed", and set 'add_pipe' to ...
                     # ...True to indicate that a new pipe needs to be added ...
@@ -209,11 +466,14 @@ class NeatApp:
             # If so, increment the player's score by 1
             self.score += 1
             # Add a new pipe to the 'pipes' list that will be placed at a ...
-            # ...position of 550 pixels on the right side of the window
-            self.pipes.append(Pipe(550))
+            # ...position of 550 pixels on the right side of the window. ...
+            # ...The score is also the index of the new pipe in the course
+            self.pipes.append(
+                Pipe(550, self.course[self.score], self.score)
+            )
+            self.score_frames.append(self.frame_count)
             # Reward each genome with 5 more fitness score points
-            for g in self.gns:
-                g.fitness += 5
+            self.birds.reward(5)
 
         # Check if there are any pipes in the 'pipes_to_remove' list that ...
         # ...need to be deleted
@@ -228,13 +488,8 @@ class NeatApp:
         """Method to draw all game elements, including birds, pipes, base
         floor, and indicator texts, onto the pygame window.
         """
-        # Load the background image from a file source as a surface ...
-        # ...object, and double its original size
-        bg_img = pygame.transform.scale2x(
-            pygame.image.load("./images/bg.png")
-        )
-        # Draw background image onto the pygame window
-        self.win.blit(bg_img, (0, 0))
+        # Draw the pre-rendered background onto the pygame window
+        self.win.blit(self.background, (0, 0))
 
         # Draw each pipe onto the pygame window
         for pipe in self.pipes:
@@ -243,30 +498,28 @@ class NeatApp:
         # Draw the base floor onto the pygame window
         self.base.draw(self.win)
 
-        # Draw each bird onto the pygame window
-        for bird in self.birds:
-            bird.draw(self.win)
+        # Draw each bird onto the pygame window. With several courses, ...
+        # ...only the birds of the first course, whose pipes are shown
+        if self.grid:
+            ids = self.birds.alive_ids
+            self.birds.draw(self.win, ids[self.grid.courses_of(ids) == 0])
+        else:
+            self.birds.draw(self.win)
 
         # Display the current score as text on the pygame window
-        score_text = self.text_font.render(
-            "Score: " + str(self.score),
-            True, # antialisa = True: Characters will have smooth edges
-            (255, 255, 255), # white text color
-        )
+        score_text = self.texts.render("score", "Score: " + str(self.score))
         self.win.blit(
             score_text,
             (self.WIN_WIDTH - 15 - score_text.get_width(), 15)
         )
 
         # Display the generation count as text on the pygame window.
-        gen_text = self.text_font.render(
-            "Gens: " + str(self.gen_count), True, (255, 255, 255)
-        )
+        gen_text = self.texts.render("gens", "Gens: " + str(self.gen_count))
         self.win.blit(gen_text, (15, 15))
 
         # Display the number of birds alive as text on the pygame window
-        alive_text = self.text_font.render(
-            "Alive: " + str(self.num_lives), True, (255, 255, 255)
+        alive_text = self.texts.render(
+            "alive", "Alive: " + str(self.num_lives)
         )
         self.win.blit(alive_text, (15, 15 + gen_text.get_height() + 10))
 
@@ -274,81 +527,226 @@ class NeatApp:
         pygame.display.update()
 
 
-    def eval_genomes(self, genomes, config):
+    def next_course_seed(self):
+        """Method to get the seed of the course of the current generation.
+        """
+        if self.seed is None:
+            # Without a run seed, every generation gets a random course
+            return random.randrange(2**32)
+        if self.fixed_course:
+            return self.seed
+        return PipeSchedule.generation_seed(self.seed, self.gen_count)
+
+
+    def course_key(self, seed):
+        """Method to get the key of a course in the fitness cache: its seed,
+        and the settings the fitness of a genome depends on.
+        Args:
+        - seed: The seed of the course (int)
+        """
+        courses = None
+        if self.multi_course:
+            courses = (
+                self.multi_course.courses, self.multi_course.aggregation,
+                self.multi_course.quantile,
+            )
+        return (seed, self.MAX_SCORE, self.decision_interval, courses)
+
+
+    def eval_genomes(self, genomes, config, seed=None):
         """The fitness function that simulates the current population of
         birds attempting to fly through the pipes, and evaluates the fitness
         of each genome (bird) in the population based on how far they
         progress in the game.
+        Args:
+        - genomes: list of (genome_id, genome) tuples
+        - config: the neat.config.Config of the genomes
+        - seed: The seed of the course (default: next_course_seed())
         """
         # Increment gen_count by 1 everytime eval_genomes() function is called
         self.gen_count += 1
         # Reset the player's score back to 0 everytime the eval_genomes() ...
         # ...function is run with a new generation
         self.score = 0
+        self.frame_count = 0
+        self.alive_curve = []
+        self.score_frames = []
+        # Create the course of pipe heights the generation will fly through
+        if seed is None:
+            seed = self.next_course_seed()
+        self.course = PipeSchedule(seed)
+
+        # Take the fitness of the genomes that already flew this course ...
+        # ...from the cache, and only simulate the others. With a budget, ...
+        # ...the fitness of a bird depends on the others, so it is not cached
+        cache = None if self.budget else self.fitness_cache
+        cached_flights = []
+        if cache:
+            course_key = self.course_key(seed)
+            genomes, cached_flights = cache.lookup(genomes, course_key)
+
+        # Simulate all birds as arrays with the vectorized engine, which ...
+        # ...is also the one flying several courses at once
+        if not genomes:
+            # Nothing is simulated when every genome hits the cache
+            if self.profiler:
+                self.profiler.reset()
+        elif self.engine == "numpy" or self.multi_course:
+            self.eval_genomes_vectorized(genomes, config)
+        else:
+            self.eval_genomes_objects(genomes, config, seed)
+        if cache and genomes:
+            cache.store(genomes, course_key, self.flights)
+        # The genomes served from the cache count in the generation's stats
+        self.add_flights(cached_flights)
+
 
-        # Create the three lists to store genomes, neural networks, and ...
-        # ...bird objects for each genome in the current generation
-        self.gns = []
-        self.nets = []
-        self.birds = []
+    def record_flights(self, moved, survived):
+        """Method to record the flight of every simulated genome: the frames
+        it was simulated for, the score it reached, and the frames each of
+        its birds survived.
+        Args:
+        - moved: frames each bird moved in, an array of shape (courses,
+        genomes)
+        - survived: frames each bird survived, same shape
+        """
+        frames = moved.max(axis=0).tolist()
+        # The score went up in a frame for the birds that survived it
+        scores = np.searchsorted(
+            self.score_frames, survived.max(axis=0)
+        ).tolist()
+        self.flights = list(
+            zip(frames, scores, map(tuple, survived.T.tolist()))
+        )
+
+
+    def add_flights(self, flights):
+        """Method to add the flights of the genomes not simulated here, ie.
+        served from the fitness cache or simulated in the workers, to the
+        score, frames and birds alive over time of the generation, as their
+        birds would have kept the game going.
+        Args:
+        - flights: (frames, score, survived frames of each bird) of each
+        genome (list of tuples)
+        """
+        if not flights:
+            return
+        self.score = max([self.score] + [score for f, score, s in flights])
+        frame_count = max([self.frame_count] + [f for f, score, s in flights])
+        if self.telemetry:
+            # A bird that survived n frames was alive after the first n ones
+            survived = [n for f, score, s in flights for n in s]
+            counts = np.bincount(survived, minlength=frame_count + 1)
+            alive = counts[::-1].cumsum()[::-1][1:frame_count + 1]
+            alive[:len(self.alive_curve)] += np.array(
+                self.alive_curve, dtype=alive.dtype
+            )
+            self.alive_curve = alive.tolist()
+        self.frame_count = frame_count
+
+
+    def eval_genomes_objects(self, genomes, config, seed):
+        """The fitness function of the "objects" engine, with one BIRD object
+        and one FeedForwardNetwork per genome.
+        """
+        # Create the flock storing the genome, neural network, and bird ...
+        # ...object for each genome in the current generation, and the ...
+        # ...frames moved and survived by the birds that left it
+        self.birds = Flock()
+        self.left = {}
         for g_id, g in genomes:
             # Set the initial fitness score of each genome to 0
             g.fitness = 0
-            # Add each genome to the 'gns' list
-            self.gns.append(g)
 
             # Create a feed-forward neural network (phenotype) for each ...
             # ...bird using their genome as blueprint
             net = neat.nn.FeedForwardNetwork.create(g, config)
-            # Add each neural network to the 'nets' list
-            self.nets.append(net)
 
-            # Create and store the bird object for each genome, all ...
-            # ...starting at the same position on the pygame window
-            self.birds.append(Bird(230, 350))
+            # Create the bird object for each genome, all starting at ...
+            # ...the same position on the pygame window, and add it to ...
+            # ...the flock together with its genome and network
+            self.birds.add(g, net, Bird(self.BIRD_X, self.BIRD_Y))
 
         # Initialise a new round of the game
         self.init_game()
 
+        # Start recording the generation, if enabled
+        if self.recorder:
+            self.recorder.begin_generation(
+                self.gen_count, [seed], [g_id for g_id, g in genomes],
+                self.birds,
+            )
+
+        # Start profiling the generation, if enabled
+        prof = self.profiler
+        if prof:
+            prof.reset()
+            prof.count("birds", len(self.birds))
+
         running = True
         while running:
-            # Set the maximum frames per second at which the game is run
-            self.clock.tick(self.FRAMES_PER_SECOND)
+            if prof:
+                prof.start_frame()
+            # Set the maximum frames per second at which the game is run. ...
+            # ...In headless mode the game runs as fast as the CPU allows
+            if not self.headless:
+                self.clock.tick(self.FRAMES_PER_SECOND)
+            if prof:
+                prof.lap("wait")
 
             # Check if there are still birds alive in the current generation
             if self.birds:
-                # Take the first pipe as the upcoming pipe
-                upcoming_pipe_id = 0
-                # If the birds are between two pipes...
-                if (len(self.pipes) > 1) and (
-                    (self.pipes[0].x + self.pipes[0].WIDTH) < self.birds[0].x
-                ):
-                    # ...take the second pipe as the upcoming pipe
-                    upcoming_pipe_id = 1
                 # Get the pipe object that the birds are flying towards or ...
                 # ...passing through
-                upcoming_pipe = self.pipes[upcoming_pipe_id]
+                upcoming_pipe = self.get_upcoming_pipe()
+
+                # The networks only decide every decision_interval frames
+                decide = self.frame_count % self.decision_interval == 0
+
+                if prof:
+                    prof.count("bird_steps", len(self.birds))
+                    if decide:
+                        prof.count("nets_activated", len(self.birds))
+                    prof.count(
+                        "collision_tests", len(self.birds) * len(self.pipes)
+                    )
 
                 # Iterate through each bird's genome, neural network, and ...
                 # ...bird object
-                for i in range(len(self.birds)):
+                for g, net, bird in self.birds:
                     # Increment fitness score of each genome by 0.1 per frame
-                    self.gns[i].fitness += 0.1
+                    g.fitness += 0.1
 
                     # Make each bird move
-                    self.birds[i].move()
-
-                    # Determine whether the bird should jump or not to ...
-                    # ...avoid hitting the upcoming pipe
-                    self.evaluate_bird_jump(
-                        net=self.nets[i],
-                        bird=self.birds[i],
-                        upcoming_pipe=upcoming_pipe,
-                    )
+                    bird.move()
+                if prof:
+                    prof.lap("move")
+
+                # Determine whether each bird should jump or not to avoid ...
+                # ...hitting the upcoming pipe. Birds never interact, so ...
+                # ...moving all birds first gives the same result
+                for g, net, bird in self.birds:
+                    if decide:
+                        self.evaluate_bird_jump(
+                            net=net,
+                            bird=bird,
+                            upcoming_pipe=upcoming_pipe,
+                        )
+                    elif bird.jumping:
+                        # Between two decisions, repeat the last jump
+                        bird.jump()
+                if self.recorder:
+                    self.recorder.record_moves(self.birds)
+                if prof:
+                    prof.lap("decide")
 
                 # Eliminate the birds that have collided with either the ...
                 # ...pipes, ceiling, or base floor
                 self.remove_colliding_birds()
+                if self.recorder:
+                    self.recorder.record_survivors(self.birds)
+                if prof:
+                    prof.lap("collide")
 
                 # Make all the pipes move and update the 'pipes' list accordingly
                 self.update_pipes()
@@ -356,20 +754,45 @@ class NeatApp:
                 # Make the base floor move
                 self.base.move()
 
+                # Stop the birds left out at the horizon of the budget
+                self.frame_count += 1
+                if self.budget:
+                    self.apply_budget()
+                if prof:
+                    prof.lap("update_pipes")
+
                 # Get the number of birds alive
                 self.num_lives = len(self.birds)
-
-                # Draw all elements onto the pygame window
-                self.draw_all()
-
-                # If the player's score exceeds 200, terminate the game
-                if self.score > 200:
+                if self.telemetry:
+                    self.alive_curve.append(self.num_lives)
+
+                if self.headless:
+                    # Without a window only advance the wing flapping ...
+                    # ...states, as they decide the birds' collision masks
+                    self.birds.animate()
+                    # Send the game to the renderer at its frame rate
+                    if self.renderer and self.renderer.due():
+                        self.renderer.publish(self)
+                else:
+                    # Draw all elements onto the pygame window
+                    self.draw_all()
+                if prof:
+                    prof.lap("draw")
+
+                # If the player's score exceeds MAX_SCORE, or the budget ...
+                # ...has no frames left, terminate the game
+                if self.score > self.MAX_SCORE or (
+                    self.budget and self.budget.out_of_frames(self.frame_count)
+                ):
                     running = False
 
             else:
                 # If all birds are extinct, terminate the evaluation.
                 running = False
 
+            # There is no window to close in headless mode
+            if self.headless:
+                continue
             # If the button "X" is clicked
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -378,6 +801,234 @@ class NeatApp:
                     # Quit the program
                     quit()
 
+        # Append the generation to the replay log
+        if self.recorder:
+            self.recorder.end_generation()
+
+        # The birds still alive flew all the frames
+        moved, survived = np.array([
+            self.left.get(id(g), (self.frame_count, self.frame_count))
+            for g_id, g in genomes
+        ]).T
+        self.record_flights(moved[None], survived[None])
+
+
+    def eval_genomes_vectorized(self, genomes, config):
+        """The fitness function of the "numpy" engine. Same game as
+        eval_genomes(), but the birds are rows of a BirdPopulation whose
+        physics, collisions and fitness are updated for all birds at once.
+        With multi-course fitness, the population is a grid with one row per
+        genome and course, and the fitness of a genome aggregates its rows.
+        """
+        # Create the list of genomes, the batched neural networks of all ...
+        # ...genomes, and a population with one bird per genome (and course)
+        self.gns = [g for g_id, g in genomes]
+        self.nets = BatchedNetwork(self.gns, config)
+        self.grid = None
+        num_rows = len(self.gns)
+        if self.multi_course:
+            self.grid = CourseGrid(
+                self.multi_course.course_seeds(self.course.seed),
+                len(self.gns),
+            )
+            num_rows *= len(self.grid)
+        self.birds = BirdPopulation(num_rows, self.BIRD_X, self.BIRD_Y)
+
+        # Initialise a new round of the game
+        self.init_game()
+
+        # Start recording the generation, if enabled
+        if self.recorder:
+            seeds = self.grid.seeds if self.grid else [self.course.seed]
+            self.recorder.begin_generation(
+                self.gen_count, seeds, [g_id for g_id, g in genomes],
+                self.birds,
+            )
+
+        # Start profiling the generation, if enabled
+        prof = self.profiler
+        if prof:
+            prof.reset()
+            prof.count("birds", len(self.birds))
+
+        running = True
+        while running:
+            if prof:
+                prof.start_frame()
+            # Set the maximum frames per second at which the game is run
+            if not self.headless:
+                self.clock.tick(self.FRAMES_PER_SECOND)
+            if prof:
+                prof.lap("wait")
+
+            # Check if there are still birds alive in the current generation
+            if self.birds:
+                # Get the pipe object that the birds are flying towards or ...
+                # ...passing through
+                upcoming_pipe = self.get_upcoming_pipe()
+
+                # The networks only decide every decision_interval frames
+                decide = self.frame_count % self.decision_interval == 0
+
+                if prof:
+                    prof.count("bird_steps", len(self.birds))
+                    if decide:
+                        prof.count("nets_activated", len(self.birds))
+                    prof.count(
+                        "collision_tests", len(self.birds) * len(self.pipes)
+                    )
+
+                # Reward all living birds by 0.1 and make them move
+                self.birds.move(0.1)
+                if prof:
+                    prof.lap("move")
+
+                # Feed the inputs of all living birds through their ...
+                # ...networks at once, and make the birds jump whose ...
+                # ...output value is higher than 0.5. Between two ...
+                # ...decisions, the birds repeat their last action
+                ids = self.birds.alive_ids
+                if decide:
+                    y = self.birds.y[ids]
+                    top_height = upcoming_pipe.top_height
+                    bottom_y = upcoming_pipe.bottom_y
+                    net_ids = ids
+                    if self.grid:
+                        # Each row flies towards the pipe of its own ...
+                        # ...course, and is controlled by the network of ...
+                        # ...its genome
+                        top_height = self.grid.heights(upcoming_pipe.index)[
+                            self.grid.courses_of(ids)
+                        ]
+                        bottom_y = top_height + Pipe.GAP
+                        net_ids = self.grid.genomes_of(ids)
+                    outputs = self.nets.activate(
+                        np.column_stack(
+                            (
+                                y,
+                                np.abs(y - top_height),
+                                np.abs(y - bottom_y),
+                            )
+                        ),
+                        net_ids,
+                    )[:, 0]
+                    self.birds.jumping[ids] = outputs > 0.5
+                self.birds.jump(ids[self.birds.jumping[ids]])
+                if self.recorder:
+                    self.recorder.record_moves(self.birds)
+                if prof:
+                    prof.lap("decide")
+
+                # Eliminate the birds that have collided with either the ...
+                # ...pipes, ceiling, or base floor
+                for pipe in self.pipes:
+                    if self.grid:
+                        self.collide_course_grid(pipe)
+                    else:
+                        self.birds.kill(self.birds.collide(pipe))
+                self.birds.kill(self.birds.out_of_bounds(self.base.y))
+                if self.recorder:
+                    self.recorder.record_survivors(self.birds)
+                if prof:
+                    prof.lap("collide")
+
+                # Make all the pipes and the base floor move
+                self.update_pipes()
+                self.base.move()
+
+                # Stop the birds left out at the horizon of the budget
+                self.frame_count += 1
+                if self.budget:
+                    self.apply_budget()
+                if prof:
+                    prof.lap("update_pipes")
+
+                # Get the number of birds alive
+                self.num_lives = len(self.birds)
+                if self.telemetry:
+                    self.alive_curve.append(self.num_lives)
+
+                if self.headless:
+                    # Advance the wing flapping states of the birds
+                    self.birds.animate()
+                    # Send the game to the renderer at its frame rate
+                    if self.renderer and self.renderer.due():
+                        self.renderer.publish(self)
+                else:
+                    # Draw all elements onto the pygame window
+                    self.draw_all()
+                if prof:
+                    prof.lap("draw")
+
+                # If the player's score exceeds MAX_SCORE, or the budget ...
+                # ...has no frames left, terminate the game
+                if self.score > self.MAX_SCORE or (
+                    self.budget and self.budget.out_of_frames(self.frame_count)
+                ):
+                    running = False
+
+            else:
+                # If all birds are extinct, terminate the evaluation.
+                running = False
+
+            # There is no window to close in headless mode
+            if self.headless:
+                continue
+            # If the button "X" is clicked
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    quit()
+
+        # Append the generation to the replay log
+        if self.recorder:
+            self.recorder.end_generation()
+
+        # Copy the fitness scores of the birds back to their genomes, ...
+        # ...aggregated over the courses of the grid
+        fitness_scores = self.birds.fitness
+        if self.grid:
+            fitness_scores = self.multi_course.aggregate(
+                fitness_scores.reshape(len(self.grid), len(self.gns))
+            )
+        for g, fitness in zip(self.gns, fitness_scores):
+            g.fitness = float(fitness)
+
+        # One row of birds per course
+        self.record_flights(*(
+            frames.reshape(-1, len(self.gns))
+            for frames in self.birds.flights()
+        ))
+
+
+    def eval_genomes_parallel(self, genomes, config):
+        """The fitness function used when training with several workers. The
+        generation is split into shards that are simulated headless in the
+        worker processes, all on the same seeded course.
+        """
+        # Increment gen_count by 1 everytime a generation is evaluated
+        self.gen_count += 1
+        # Get the seed of the course shared by all shards
+        seed = self.next_course_seed()
+        self.course = PipeSchedule(seed)
+        # Only send the genomes missing the fitness cache to the workers
+        cache = None if self.budget else self.fitness_cache
+        cached_flights = []
+        if cache:
+            course_key = self.course_key(seed)
+            genomes, cached_flights = cache.lookup(genomes, course_key)
+        # The frames are simulated in the workers, so the score and ...
+        # ...frames of the generation are rebuilt from the flights
+        self.score = 0
+        self.frame_count = 0
+        self.alive_curve = []
+        if genomes:
+            self.evaluator.evaluate(genomes, seed)
+            if cache:
+                cache.store(genomes, course_key, self.evaluator.flights)
+            cached_flights = cached_flights + self.evaluator.flights
+        self.add_flights(cached_flights)
+
 
     def run(self):
         """Method to run the NEAT algorithm to evolve and evaluate the
@@ -386,6 +1037,41 @@ class NeatApp:
         # Show statistics in terminal
         self.p.add_reporter(neat.StdOutReporter(True)) # show_species_details = True
         self.p.add_reporter(neat.StatisticsReporter())
+        # Write the timings of the frame loop phases, if profiling
+        if self.profiler:
+            self.p.add_reporter(
+                PhaseTimingReporter(self.profiler, self.profile_path)
+            )
+
+        # Report the hits and misses of the fitness cache, if enabled
+        if self.fitness_cache and not self.budget:
+            self.p.add_reporter(FitnessCacheReporter(self.fitness_cache))
+
+        # Stream the statistics of every generation, if enabled
+        if self.telemetry_port is not None:
+            self.telemetry = TelemetryServer(port=self.telemetry_port)
+            self.p.add_reporter(TelemetryReporter(self.telemetry, self))
+            print("Streaming telemetry on {}:{}".format(
+                self.telemetry.host, self.telemetry.port
+            ))
+
+        # Save checkpoints of the run in the background, if enabled
+        checkpointer = None
+        if self.checkpoint_prefix:
+            checkpointer = CheckpointReporter(
+                self.p, self.checkpoint_prefix, self.checkpoint_interval
+            )
+            self.p.add_reporter(checkpointer)
+
+        # Show the training in a renderer process, if watched
+        if self.watch:
+            self.renderer = SnapshotRenderer(
+                (self.WIN_WIDTH, self.WIN_HEIGHT), self.FRAMES_PER_SECOND,
+                self.watch_top_k,
+            )
+
+        # A resumed run only evolves the generations it has left
+        num_gens = max(self.MAX_GENS - self.p.generation, 0)
 
         # The population object "p" evolves genomes and calls the fitness...
         # ...function eval_genomes() to evaluate genomes successively for up...
@@ -393,14 +1079,73 @@ class NeatApp:
         # ...or exceeded in the latest evaluation process, the 'p' object ...
         # ...will stop further evolving the genomes and no more evaluation ...
         # ...will occur.
-        winner = self.p.run(self.eval_genomes, self.MAX_GENS)
+        try:
+            if self.workers > 1:
+                # Evaluate the generations in a pool of worker processes
+                self.evaluator = ParallelEvaluator(
+                    self.config_path, self.workers, self.engine
+                )
+                try:
+                    winner = self.p.run(self.eval_genomes_parallel, num_gens)
+                finally:
+                    self.evaluator.close()
+            else:
+                winner = self.p.run(self.eval_genomes, num_gens)
+        finally:
+            # Finish writing the last checkpoint
+            if checkpointer:
+                checkpointer.close()
+            # Close the window of the renderer
+            if self.renderer:
+                self.renderer.close()
+                self.renderer = None
+            # Send the last statistics and stop the telemetry server
+            if self.telemetry:
+                self.telemetry.close()
+                self.telemetry = None
+
+        self.save_winner(winner)
+
+
+    def run_islands(self, num_islands, migration_interval=5,
+                    num_migrants=2, resume=None):
+        """Method to evolve several islands of birds in separate processes
+        for up to MAX_GENS generations, with their fittest genomes migrating
+        between them, and save the fittest genome of all islands.
+        Args:
+        - num_islands: Number of islands, one process each (int)
+        - migration_interval: Number of generations between two migrations
+        (int)
+        - num_migrants: Number of genomes each island sends to the next one
+        at every migration (int)
+        - resume: Path of the manifest of an island run to resume, or
+        "latest" for the one with the checkpoint prefix (str)
+        """
+        coordinator = IslandCoordinator(
+            self.config_path, num_islands, migration_interval, num_migrants,
+            self.engine, self.seed, self.checkpoint_prefix, resume,
+        )
+        try:
+            winner = coordinator.run(self.MAX_GENS)
+        finally:
+            coordinator.close()
+        self.save_winner(winner)
 
+
+    def save_winner(self, winner):
+        """Method to show the winner genome, and save it to winner.pkl and
+        as a compiled network to winner.net.
+        Args:
+        - winner: the winner genome (neat.DefaultGenome)
+        """
         # Show stats for the winner genome in the terminal
         print("\nBest genome:\n{!s}".format(winner))
 
         # Save the winner genome to a pkl file
         with open("winner.pkl", "wb") as f:
             pickle.dump(winner, f)
+        # Also export it as a compiled network, for standalone inference
+        CompiledNetwork.from_genome(winner, self.config).save("winner.net")
 
 
     def play_with_best_bird(self, genome_path):
@@ -416,8 +1161,23 @@ class NeatApp:
             # Convert loaded genome into required data structure
             genomes = [(1, genome)]
 
-            # Call the eval_genomes() method with only the loaded genome
-            self.eval_genomes(genomes, self.config)
+            # Call the eval_genomes() method with only the loaded genome. ...
+            # ...The game is always drawn here, even for a headless app, ...
+            # ...on a single course without evaluation budget, and not ...
+            # ...recorded nor taken from the fitness cache
+            saved = (
+                self.headless, self.budget, self.multi_course, self.recorder,
+                self.fitness_cache,
+            )
+            self.headless, self.budget = False, None
+            self.multi_course, self.recorder, self.fitness_cache = (
+                None, None, None
+            )
+            try:
+                self.eval_genomes(genomes, self.config)
+            finally:
+                (self.headless, self.budget, self.multi_course,
+                 self.recorder, self.fitness_cache) = saved
 
         else:
             print(
@@ -429,13 +1189,123 @@ class NeatApp:
 
 # Check if this script is being run directly (and not imported as a module)
 if __name__ == "__main__":
+    # Parse the command line options
+    parser = argparse.ArgumentParser(
+        description="Evolve a population of birds with NEAT."
+    )
+    parser.add_argument(
+        "--config", default="./config-feedforward.txt",
+        help="path to the NEAT configuration file",
+    )
+    parser.add_argument(
+        "--headless", action="store_true",
+        help="train without a window and without frame rate limit",
+    )
+    parser.add_argument(
+        "--engine", choices=NeatApp.ENGINES, default="objects",
+        help="engine simulating the birds of each generation",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="number of processes evaluating each generation in parallel",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="seed of the run, making the pipe courses reproducible",
+    )
+    parser.add_argument(
+        "--fixed-course", action="store_true",
+        help="fly the course given by --seed in every generation",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="train headless at full speed, and show the training in a "
+        "separate window at 30 FPS",
+    )
+    parser.add_argument(
+        "--watch-top", type=int, default=None, metavar="K",
+        help="only show the K fittest birds in the --watch window",
+    )
+    parser.add_argument(
+        "--profile", metavar="PATH", default=None,
+        help="time the phases of the frame loop, and write them per "
+        "generation to PATH.jsonl and PATH.csv",
+    )
+    parser.add_argument(
+        "--checkpoint", metavar="PREFIX", default=None,
+        help="checkpoint the run to files starting with PREFIX",
+    )
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=1, metavar="N",
+        help="number of generations between two checkpoints",
+    )
+    parser.add_argument(
+        "--resume", metavar="PATH", nargs="?", const="latest", default=None,
+        help="resume the run from a checkpoint file (default: the latest "
+        "checkpoint with the --checkpoint prefix)",
+    )
+    parser.add_argument(
+        "--record", metavar="PATH", default=None,
+        help="record the jumps of every bird of the training to the replay "
+        "log PATH, to replay them with REPLAY_mmap.py",
+    )
+    parser.add_argument(
+        "--telemetry", type=int, default=None, metavar="PORT",
+        help="stream the statistics of every generation as JSON lines on "
+        "the local TCP port PORT (raw socket or HTTP)",
+    )
+    parser.add_argument(
+        "--islands", type=int, default=0, metavar="N",
+        help="evolve N populations in separate processes, exchanging their "
+        "fittest genomes (--resume then resumes the islands)",
+    )
+    parser.add_argument(
+        "--migrate-every", type=int, default=5, metavar="N",
+        help="number of generations between two migrations of --islands",
+    )
+    parser.add_argument(
+        "--migrants", type=int, default=2, metavar="K",
+        help="number of genomes each island sends at every migration",
+    )
+    parser.add_argument(
+        "--no-play", action="store_true",
+        help="do not play the game with the winner genome after training",
+    )
+    args = parser.parse_args()
+    if args.resume == "latest" and not args.checkpoint:
+        parser.error(
+            "--resume without a PATH resumes the latest checkpoint, and "
+            "needs --checkpoint"
+        )
+    islands = args.islands > 1
+    if islands and (args.workers > 1 or args.watch or args.profile
+                    or args.record or args.telemetry is not None):
+        parser.error(
+            "--islands cannot be combined with --workers, --watch, "
+            "--profile, --record or --telemetry"
+        )
+
     # Create an instance of the 'NeatApp' class with the specified ...
     # ...configuration file path
-    app = NeatApp("./config-feedforward.txt")
+    app = NeatApp(
+        args.config, headless=args.headless, engine=args.engine,
+        workers=args.workers, seed=args.seed, fixed_course=args.fixed_course,
+        profile_path=args.profile, checkpoint_prefix=args.checkpoint,
+        checkpoint_interval=args.checkpoint_every,
+        resume=None if islands else args.resume,
+        watch=args.watch, watch_top_k=args.watch_top,
+        record_path=args.record, telemetry_port=args.telemetry,
+    )
 
     # Run successive generations to evolve and evaluate 100 birds ...
     # ...(genomes) at a time, and save the winner genome in the end
-    app.run()
+    if islands:
+        app.run_islands(
+            args.islands, args.migrate_every, args.migrants, args.resume
+        )
+    else:
+        app.run()
 
     # Load the winner genome, and play the game using the best bird only
-    app.play_with_best_bird("winner.pkl")
+    if not args.no_play:
+        app.play_with_best_bird("winner.pkl")
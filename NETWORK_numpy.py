@@ -0,0 +1,198 @@
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+
+
+def tanh_activation(z):
+    """NumPy version of neat's tanh activation function."""
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def sigmoid_activation(z):
+    """NumPy version of neat's sigmoid activation function."""
+    return 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0)))
+
+
+def relu_activation(z):
+    """NumPy version of neat's relu activation function."""
+    return np.where(z > 0.0, z, 0.0)
+
+
+def identity_activation(z):
+    """NumPy version of neat's identity activation function."""
+    return z
+
+
+# Activation functions supported by the batched networks, in the order of ...
+# ...their integer codes
+ACTIVATIONS = {
+    "tanh": tanh_activation,
+    "sigmoid": sigmoid_activation,
+    "relu": relu_activation,
+    "identity": identity_activation,
+}
+ACTIVATION_CODES = {name: code for code, name in enumerate(ACTIVATIONS)}
+
+
+class BatchedNetwork:
+    """Class for the feed-forward neural networks of a whole generation of
+    genomes compiled into padded, layered NumPy tensors, so the outputs of
+    all birds are computed with a few array operations per layer instead of
+    one FeedForwardNetwork.activate() graph walk per bird.
+
+    Every genome owns a row of 'value slots': its inputs, its outputs and its
+    hidden nodes, followed by a slot that is always 0 (used by padded
+    connections) and a slot that absorbs the writes of padded nodes. For each
+    layer, every node lists the slots and weights of its incoming
+    connections in the same order as FeedForwardNetwork, so the weighted sums
+    are accumulated in the same order too. The outputs match
+    FeedForwardNetwork.activate() up to the last few bits of np.tanh.
+    """
+
+    def __init__(self, genomes, config):
+        """Compile the given genomes into layered weight tensors.
+        Args:
+        - genomes: list of neat.DefaultGenome objects
+        - config: the neat.config.Config of the genomes
+        """
+        genome_config = config.genome_config
+        self.input_keys = list(genome_config.input_keys)
+        self.output_keys = list(genome_config.output_keys)
+        self.num_genomes = len(genomes)
+        num_io = len(self.input_keys) + len(self.output_keys)
+
+        # Collect the layers of nodes of each genome, exactly as ...
+        # ...FeedForwardNetwork.create() does
+        compiled = []
+        for genome in genomes:
+            connections = [
+                cg.key for cg in genome.connections.values() if cg.enabled
+            ]
+            layers = feed_forward_layers(
+                self.input_keys, self.output_keys, connections
+            )
+            # Map every node key to its value slot
+            slots = {k: i for i, k in enumerate(self.input_keys)}
+            slots.update({
+                k: len(self.input_keys) + i
+                for i, k in enumerate(self.output_keys)
+            })
+            nodes = []
+            for layer in layers:
+                layer_nodes = []
+                for node in layer:
+                    if node not in slots:
+                        slots[node] = len(slots)
+                    ng = genome.nodes[node]
+                    if ng.aggregation != "sum":
+                        raise ValueError(
+                            "Unsupported aggregation {!r} of node {} in "
+                            "genome {}".format(
+                                ng.aggregation, node, genome.key
+                            )
+                        )
+                    if ng.activation not in ACTIVATIONS:
+                        raise ValueError(
+                            "Unsupported activation {!r} of node {} in "
+                            "genome {}".format(ng.activation, node, genome.key)
+                        )
+                    links = [
+                        (inode, genome.connections[(inode, onode)].weight)
+                        for inode, onode in connections if onode == node
+                    ]
+                    layer_nodes.append((node, ng, links))
+                nodes.append(layer_nodes)
+            compiled.append((slots, nodes))
+
+        # Size the padded tensors for the largest genome
+        self.num_layers = max([len(nodes) for _, nodes in compiled] + [0])
+        width = max(
+            [len(layer) for _, nodes in compiled for layer in nodes] + [1]
+        )
+        fan_in = max(
+            [
+                len(links) for _, nodes in compiled
+                for layer in nodes for _, _, links in layer
+            ] + [1]
+        )
+        self.num_slots = max(
+            [len(slots) for slots, _ in compiled] + [num_io]
+        ) + 2
+        # The last two slots: one always 0, one receiving padded writes
+        self.zero_slot = self.num_slots - 2
+        self.trash_slot = self.num_slots - 1
+
+        shape = (self.num_genomes, self.num_layers, width)
+        self.targets = np.full(shape, self.trash_slot, dtype=np.int64)
+        self.sources = np.full(
+            shape + (fan_in,), self.zero_slot, dtype=np.int64
+        )
+        self.weights = np.zeros(shape + (fan_in,), dtype=np.float64)
+        self.biases = np.zeros(shape, dtype=np.float64)
+        self.responses = np.ones(shape, dtype=np.float64)
+        self.activations = np.zeros(shape, dtype=np.int64)
+
+        # Fill in the tensors of each genome
+        for b, (slots, nodes) in enumerate(compiled):
+            for l, layer in enumerate(nodes):
+                for j, (node, ng, links) in enumerate(layer):
+                    self.targets[b, l, j] = slots[node]
+                    self.biases[b, l, j] = ng.bias
+                    self.responses[b, l, j] = ng.response
+                    self.activations[b, l, j] = ACTIVATION_CODES[ng.activation]
+                    for k, (inode, weight) in enumerate(links):
+                        self.sources[b, l, j, k] = slots[inode]
+                        self.weights[b, l, j, k] = weight
+
+        # Activation functions actually used by the compiled genomes
+        self.used_activations = [
+            (code, ACTIVATIONS[name])
+            for name, code in ACTIVATION_CODES.items()
+            if (self.activations == code).any()
+        ] or [(ACTIVATION_CODES["tanh"], tanh_activation)]
+
+
+    def activate(self, inputs, ids=None):
+        """Method to feed a batch of inputs through the networks. Returns an
+        array of shape (len(inputs), num_outputs).
+        Args:
+        - inputs: array of shape (n, num_inputs), one row per network
+        - ids: indices of the genomes the rows belong to (default: all)
+        """
+        inputs = np.asarray(inputs, dtype=np.float64)
+        if ids is None:
+            ids = np.arange(self.num_genomes)
+        ids = np.asarray(ids, dtype=np.int64)
+        num_inputs = len(self.input_keys)
+        if inputs.shape != (len(ids), num_inputs):
+            raise RuntimeError(
+                "Expected inputs of shape {}, got {}".format(
+                    (len(ids), num_inputs), inputs.shape
+                )
+            )
+
+        # Value slots of every network, with all nodes starting at 0
+        values = np.zeros((len(ids), self.num_slots), dtype=np.float64)
+        values[:, :num_inputs] = inputs
+        rows = np.arange(len(ids))[:, None]
+
+        for l in range(self.num_layers):
+            sources = self.sources[ids, l]
+            weights = self.weights[ids, l]
+            # Weighted sum of the incoming values, accumulated connection ...
+            # ...by connection like neat's sum aggregation
+            s = values[rows, sources[:, :, 0]] * weights[:, :, 0]
+            for k in range(1, sources.shape[2]):
+                s = s + values[rows, sources[:, :, k]] * weights[:, :, k]
+            z = self.biases[ids, l] + self.responses[ids, l] * s
+
+            if len(self.used_activations) == 1:
+                out = self.used_activations[0][1](z)
+            else:
+                codes = self.activations[ids, l]
+                out = np.zeros_like(z)
+                for code, func in self.used_activations:
+                    out = np.where(codes == code, func(z), out)
+            values[rows, self.targets[ids, l]] = out
+
+        return values[:, num_inputs:num_inputs + len(self.output_keys)]
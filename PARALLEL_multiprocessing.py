@@ -0,0 +1,110 @@
+import multiprocessing
+
+
+
+"""
+Birds never interact with each other: the trajectory and fitness of a bird
+only depend on its own network and on the pipe sequence, and the pipes keep
+moving as long as any bird is alive. A generation can therefore be split
+into shards that are simulated in separate processes, as long as every shard
+replays the same course. Every worker builds the PipeSchedule of the course
+seed shared by the whole generation before simulating its shard, so all
+shards see the same pipe heights and the fitness scores are exactly those of
+a single-process run on that course.
+"""
+
+
+# The headless NEAT app of a worker process, created once per process
+_worker_app = None
+
+
+def _init_worker(config_path, engine):
+    """Initialise a worker process with its own headless NEAT app.
+    Args:
+    - config_path: The path to the configuration file.
+    - engine: The engine simulating the birds (str)
+    """
+    global _worker_app
+    # Imported here, as Main.py imports this module
+    from Main import NeatApp
+    _worker_app = NeatApp(config_path, headless=True, engine=engine)
+    # Only the main process looks up and stores the fitness cache, ...
+    # ...so the workers simulate every genome they are sent
+    _worker_app.fitness_cache = None
+
+
+def _evaluate_shard(shard, seed):
+    """Simulate a shard of genomes on the course given by the seed, and
+    return the fitness and flight of each genome and the score reached.
+    Args:
+    - shard: list of (genome_id, genome) tuples
+    - seed: The seed of the pipe heights (int)
+    """
+    _worker_app.eval_genomes(shard, _worker_app.config, seed)
+    return [
+        (g_id, g.fitness, flight)
+        for (g_id, g), flight in zip(shard, _worker_app.flights)
+    ], _worker_app.score
+
+
+class ParallelEvaluator:
+    """Class for evaluating the genomes of a generation in a pool of worker
+    processes, each simulating a shard of the genomes headless on the same
+    seeded course.
+    """
+
+    def __init__(self, config_path, num_workers=None, engine="objects",
+                 shards_per_worker=4):
+        """Initialize the evaluator and start its pool of workers.
+        Args:
+        - config_path: The path to the configuration file.
+        - num_workers: Number of worker processes (default: CPU count)
+        - engine: The engine simulating the birds in the workers (str)
+        - shards_per_worker: Number of shards per worker, so workers whose
+        birds die early pick up more shards (int)
+        """
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.shards_per_worker = shards_per_worker
+        self.pool = multiprocessing.Pool(
+            self.num_workers,
+            initializer=_init_worker,
+            initargs=(config_path, engine),
+        )
+        # Score reached in the last evaluated generation, and the flight ...
+        # ...of each of its genomes (see NeatApp.record_flights())
+        self.score = 0
+        self.flights = []
+
+
+    def evaluate(self, genomes, seed):
+        """Method to evaluate the genomes on the course given by the seed,
+        setting the fitness of every genome.
+        Args:
+        - genomes: list of (genome_id, genome) tuples
+        - seed: The seed of the pipe heights (int)
+        """
+        genomes = list(genomes)
+        num_shards = min(
+            len(genomes), self.num_workers * self.shards_per_worker
+        )
+        shards = [genomes[i::num_shards] for i in range(num_shards)]
+
+        # Copy the fitness scores computed by the workers back to the genomes
+        genome_dict = dict(genomes)
+        flights = {}
+        self.score = 0
+        for results, score in self.pool.starmap(
+            _evaluate_shard, [(shard, seed) for shard in shards]
+        ):
+            for g_id, fitness, flight in results:
+                genome_dict[g_id].fitness = fitness
+                flights[g_id] = flight
+            # The pipes keep coming while any bird of the shard is alive
+            self.score = max(self.score, score)
+        self.flights = [flights[g_id] for g_id, g in genomes]
+
+
+    def close(self):
+        """Method to stop the worker processes."""
+        self.pool.close()
+        self.pool.join()
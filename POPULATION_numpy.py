@@ -0,0 +1,208 @@
+import numpy as np
+from BIRD_pygame import Bird
+
+
+
+class BirdPopulation:
+    """Class for a whole population of flappy birds stored as a structure of
+    NumPy arrays (one row per bird), so the physics of every living bird is
+    advanced in one batched step instead of one Bird.move() call per bird.
+    The trajectories are identical to those of BIRD objects.
+    """
+
+    # Reuse the physics constants of a single bird
+    IMGS = Bird.IMGS
+    MAX_ROTATION = Bird.MAX_ROTATION
+    ROT_VEL = Bird.ROT_VEL
+    ANIMATION_TIME = Bird.ANIMATION_TIME
+    ACCELERATION = Bird.ACCELERATION
+    # All bird images have the same size
+    IMG_HEIGHT = Bird.IMGS[0].get_height()
+    # Displacement and tilt tables of the trajectories after spawning ...
+    # ...(row 0) and after a jump (row 1), by tick
+    STEADY_TICKS = Bird.JUMP_TRAJECTORY.ticks
+    DISPLACEMENTS = np.stack((
+        Bird.SPAWN_TRAJECTORY.displacement_array,
+        Bird.JUMP_TRAJECTORY.displacement_array,
+    ))
+    TILTS = np.stack((
+        Bird.SPAWN_TRAJECTORY.tilt_array, Bird.JUMP_TRAJECTORY.tilt_array,
+    ))
+
+    def __init__(self, size: int, x: int, y: int):
+        """Initialize a population of birds all starting at the same position.
+        Args:
+        - size: number of birds in the population (int)
+        - x: starting position on x-axis shared by all birds (int)
+        - y: starting position on y-axis shared by all birds (int)
+        """
+        self.size = size
+        # The birds never move along the x-axis, so x is shared by all of them
+        self.x = x
+        # Per-bird state, mirroring the attributes of a BIRD object
+        self.y = np.full(size, y, dtype=np.float64)
+        self.height = self.y.copy()
+        self.tilt = np.zeros(size, dtype=np.int64)
+        self.tick_count = np.zeros(size, dtype=np.int64)
+        self.vel = np.zeros(size, dtype=np.float64)
+        # Row of the trajectory tables of each bird: 1 once it has jumped
+        self.trajectory = np.zeros(size, dtype=np.int64)
+        # Index into IMGS of the current image, and the animation counter
+        self.img_index = np.zeros(size, dtype=np.int64)
+        self.img_count = np.zeros(size, dtype=np.int64)
+        # Whether each bird's controller last decided to jump, an action ...
+        # ...held until its next decision
+        self.jumping = np.zeros(size, dtype=bool)
+        # Fitness score accumulated by each bird
+        self.fitness = np.zeros(size, dtype=np.float64)
+        # Whether each bird is still in the game
+        self.alive = np.ones(size, dtype=bool)
+        # Row indices of the living birds, refreshed whenever birds die
+        self.alive_ids = np.arange(size)
+        # Number of frames moved so far, and for each bird that left the ...
+        # ...game, the frames it moved in and the frames it survived
+        self.frames = 0
+        self.moved = np.zeros(size, dtype=np.int64)
+        self.survived = np.zeros(size, dtype=np.int64)
+
+
+    def __len__(self):
+        """Return the number of birds still alive."""
+        return len(self.alive_ids)
+
+
+    def move(self, points=0.1):
+        """Method to make all living birds move by one frame, and reward each
+        of them with the given fitness points for surviving the frame.
+        Args:
+        - points: fitness points added to each living bird (float)
+        """
+        ids = self.alive_ids
+        self.fitness[ids] += points
+        self.frames += 1
+
+        # Incrementing tick_count
+        tick_count = self.tick_count[ids] + 1
+        self.tick_count[ids] = tick_count
+
+        # Look up the displacement and tilt of the tick in the trajectory ...
+        # ...tables, the same as Bird.move() computes
+        rows = self.trajectory[ids]
+        ticks = np.minimum(tick_count, self.STEADY_TICKS)
+        self.y[ids] += self.DISPLACEMENTS[rows, ticks]
+        self.tilt[ids] = self.TILTS[rows, ticks]
+
+
+    def jump(self, ids):
+        """Method to make the given birds jump.
+        Args:
+        - ids: row indices (or boolean mask) of the birds to jump
+        """
+        self.vel[ids] = Bird.JUMP_VEL
+        self.trajectory[ids] = 1
+        self.tick_count[ids] = 0
+        self.height[ids] = self.y[ids]
+
+
+    def out_of_bounds(self, floor_y):
+        """Method to find the living birds that have hit the ceiling or the
+        floor. Returns their row indices.
+        Args:
+        - floor_y: position of the base floor on y-axis
+        """
+        ids = self.alive_ids
+        y = self.y[ids]
+        return ids[(y <= 0) | (y + self.IMG_HEIGHT >= floor_y)]
+
+
+    def collide(self, pipe, ids=None, top_height=None):
+        """Method to find the living birds colliding with the given pipe, all
+        tested in one array operation. Returns their row indices.
+        Args:
+        - pipe: an object of PIPE
+        - ids: row indices of the living birds to test (default: all)
+        - top_height: height of the top pipe for each of these birds, for
+        birds flying different courses (default: the pipe's height)
+        """
+        if ids is None:
+            ids = self.alive_ids
+        hits = pipe.collide_many(
+            self.img_index[ids], self.x, self.y[ids], top_height
+        )
+        return ids[hits]
+
+
+    def kill(self, ids, crashed=True):
+        """Method to remove the given birds from the game.
+        Args:
+        - ids: row indices (or boolean mask) of the birds to remove
+        - crashed: whether the birds crashed in the frame they have just
+        moved in, rather than being stopped after it (bool)
+        """
+        self.moved[ids] = self.frames
+        self.survived[ids] = self.frames - 1 if crashed else self.frames
+        self.alive[ids] = False
+        self.alive_ids = np.flatnonzero(self.alive)
+
+
+    def flights(self):
+        """Get the number of frames each bird moved in, and the number of
+        frames it survived (arrays), the birds still alive having flown all
+        the frames so far.
+        """
+        moved = np.where(self.alive, self.frames, self.moved)
+        survived = np.where(self.alive, self.frames, self.survived)
+        return moved, survived
+
+
+    def reward(self, points):
+        """Method to add fitness points to every living bird.
+        Args:
+        - points: fitness points added to each living bird (float)
+        """
+        self.fitness[self.alive_ids] += points
+
+
+    def animate(self):
+        """Method to advance the wing flapping animation of all living birds
+        by one frame, following the same cycle as Bird.animate().
+        """
+        ids = self.alive_ids
+        img_count = self.img_count[ids] + 1
+        # Start a new wings flapping session after four states
+        img_count[img_count == self.ANIMATION_TIME * 4 + 1] = 1
+        # ↖ ↼ ↙ ↼ : image 0, 1, 2, 1 for ANIMATION_TIME frames each
+        img_index = np.array([0, 1, 2, 1])[
+            (img_count - 1) // self.ANIMATION_TIME
+        ]
+        # Fixed wing flapping state when tilted more than 80 degrees down
+        diving = self.tilt[ids] < -80
+        img_index[diving] = 1
+        img_count[diving] = self.ANIMATION_TIME * 2
+        self.img_count[ids] = img_count
+        self.img_index[ids] = img_index
+
+
+    def draw(self, win, ids=None):
+        """Draw the living birds flapping wings on the pygame window.
+        Args:
+        - win: pygame window or surface
+        - ids: row indices of the living birds to draw (default: all). The
+        wing flapping states of all living birds are advanced anyway
+        """
+        self.animate()
+        if ids is None:
+            ids = self.alive_ids
+        blits = []
+        for img_index, tilt, y in zip(
+            self.img_index[ids].tolist(), self.tilt[ids].tolist(),
+            self.y[ids].tolist(),
+        ):
+            img = self.IMGS[img_index]
+            # Get the bird image rotated around its center (cached by ...
+            # ...image and tilt)
+            rotated_image, (offset_x, offset_y) = img.rotated(tilt)
+            left, top = img.get_rect(topleft=(self.x, y)).topleft
+            blits.append((rotated_image, (left + offset_x, top + offset_y)))
+        # Draw all the birds in one call
+        win.blits(blits, doreturn=False)
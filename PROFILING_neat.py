@@ -0,0 +1,171 @@
+import csv
+import json
+import time
+import numpy as np
+from neat.reporting import BaseReporter
+
+
+
+"""
+Opt-in instrumentation of the frame loop of NeatApp.eval_genomes(). The loop
+is split into phases:
+- wait: waiting for the next frame (clock.tick(), only with a window)
+- move: moving the birds (and rewarding them for staying alive)
+- decide: activating the neural networks and making the birds jump
+- collide: eliminating the birds colliding with the pipes, ceiling or floor
+- update_pipes: moving the pipes and the base floor, and scoring
+- draw: drawing the game (or only animating the birds in headless mode)
+
+A FrameProfiler records the duration of every phase in every frame, and
+counts the work done: birds alive per frame (bird-steps), bird/pipe
+collision tests and network activations. A PhaseTimingReporter writes them
+once per generation, as JSON lines and CSV rows.
+
+Only the generations evaluated in the main process are profiled, not those
+split across worker processes (--workers).
+"""
+
+
+
+class FrameProfiler:
+    """Class for timing the phases of the frame loop of eval_genomes(), and
+    counting the work done in each generation. The frame loop calls lap()
+    at the end of every phase, which records the time since the previous
+    lap. Profiling is opt-in: without a profiler, the frame loop only pays
+    for one 'if' per phase.
+    """
+
+    # Phases of the frame loop, in order
+    PHASES = ("wait", "move", "decide", "collide", "update_pipes", "draw")
+    # Upper bounds (in microseconds) of the timing histogram buckets: ...
+    # ...1, 2, 4, ... up to about 1 second, and above
+    BUCKETS = tuple(2**i for i in range(21)) + (float("inf"),)
+
+    def __init__(self):
+        """Initialize the profiler with empty timings and counters."""
+        self.reset()
+
+
+    def reset(self):
+        """Method to clear the timings and counters, at the start of the
+        evaluation of a generation.
+        """
+        # Durations (in nanoseconds) of each phase, one per frame
+        self.timings = {phase: [] for phase in self.PHASES}
+        # Counters of the work done in the generation
+        self.counters = {
+            "frames": 0,
+            "birds": 0,
+            "bird_steps": 0,
+            "collision_tests": 0,
+            "nets_activated": 0,
+        }
+        self.last = time.perf_counter_ns()
+        self.started = self.last
+
+
+    def start_frame(self):
+        """Method to mark the start of a frame."""
+        self.counters["frames"] += 1
+        self.last = time.perf_counter_ns()
+
+
+    def lap(self, phase):
+        """Method to record the time spent in the given phase, ie. since the
+        start of the frame or the previous lap.
+        Args:
+        - phase: name of the phase, one of PHASES (str)
+        """
+        now = time.perf_counter_ns()
+        self.timings[phase].append(now - self.last)
+        self.last = now
+
+
+    def count(self, counter, amount=1):
+        """Method to add an amount to a counter.
+        Args:
+        - counter: name of the counter (str)
+        - amount: amount to add (int)
+        """
+        self.counters[counter] += amount
+
+
+    def summary(self):
+        """Return the timings and counters of the generation as a dict: the
+        counters, the wall time, and for each phase its total, mean,
+        percentiles and histogram of the durations in microseconds.
+        """
+        phases = {}
+        for phase, durations in self.timings.items():
+            us = np.array(durations, dtype=np.float64) / 1000
+            if len(us) == 0:
+                continue
+            histogram, _ = np.histogram(us, bins=(0,) + self.BUCKETS)
+            phases[phase] = {
+                "total_ms": us.sum() / 1000,
+                "mean_us": us.mean(),
+                "p50_us": np.percentile(us, 50),
+                "p95_us": np.percentile(us, 95),
+                "max_us": us.max(),
+                "histogram": histogram.tolist(),
+            }
+        return {
+            "wall_ms": (time.perf_counter_ns() - self.started) / 1e6,
+            "counters": dict(self.counters),
+            "phases": phases,
+        }
+
+
+
+class PhaseTimingReporter(BaseReporter):
+    """Class for a neat-python reporter writing the timings and counters of a
+    FrameProfiler after the evaluation of every generation, as one JSON
+    object per line to a .jsonl file and one row per generation to a .csv
+    file.
+    """
+
+    def __init__(self, profiler, path):
+        """Initialize the reporter.
+        Args:
+        - profiler: the FrameProfiler of the evaluated generations
+        - path: path of the output files, without extension (str)
+        """
+        self.profiler = profiler
+        self.json_path = path + ".jsonl"
+        self.csv_path = path + ".csv"
+        self.generation = None
+        # Start both files empty, with the CSV header
+        open(self.json_path, "w").close()
+        self.columns = (
+            ["generation", "wall_ms"]
+            + list(profiler.counters)
+            + [
+                "{}_{}".format(phase, stat)
+                for phase in profiler.PHASES
+                for stat in ("total_ms", "mean_us", "p95_us")
+            ]
+        )
+        with open(self.csv_path, "w", newline="") as f:
+            csv.writer(f).writerow(self.columns)
+
+
+    def start_generation(self, generation):
+        """Record the generation number."""
+        self.generation = generation
+
+
+    def post_evaluate(self, config, population, species, best_genome):
+        """Write the profile of the generation just evaluated."""
+        summary = self.profiler.summary()
+        summary["generation"] = self.generation
+        with open(self.json_path, "a") as f:
+            f.write(json.dumps(summary) + "\n")
+
+        row = dict(summary["counters"])
+        row["generation"] = self.generation
+        row["wall_ms"] = summary["wall_ms"]
+        for phase, stats in summary["phases"].items():
+            for stat in ("total_ms", "mean_us", "p95_us"):
+                row["{}_{}".format(phase, stat)] = stats[stat]
+        with open(self.csv_path, "a", newline="") as f:
+            csv.writer(f).writerow([row.get(c, "") for c in self.columns])
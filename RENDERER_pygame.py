@@ -0,0 +1,196 @@
+import time
+import queue
+import multiprocessing
+import numpy as np
+import pygame
+from POPULATION_numpy import BirdPopulation
+
+
+
+"""
+Decoupled rendering of a training run: the generations are simulated headless
+at full speed, and a separate process shows them in a window at a capped
+frame rate.
+
+About FRAMES_PER_SECOND times per second, the simulation publishes a small
+snapshot of the game: the position, tilt and image of the birds shown, the
+pipes, the base floor, the score, the generation and the number of birds
+alive. The renderer process only ever draws the latest snapshot it has
+received, so it never slows the simulation down: publishing is skipped
+between two display frames, and a snapshot is dropped if the renderer has
+not taken the previous ones yet. Closing the window stops the rendering, and
+the training carries on headless.
+
+Optionally only the top K birds are shown: those with the highest fitness
+(and, among birds alive with the same fitness, the first ones).
+"""
+
+
+
+def take_snapshot(app, top_k=None):
+    """Take a snapshot of the game simulated by a NeatApp, as a dict of plain
+    values that is cheap to send to the renderer process.
+    Args:
+    - app: the NeatApp simulating a generation
+    - top_k: if given, only the birds with the K highest fitness scores are
+    included (int)
+    """
+    birds = app.birds
+    if isinstance(birds, BirdPopulation):
+        # Rows of a BirdPopulation, only those of the first course of a ...
+        # ...course grid, whose pipes are shown
+        ids = birds.alive_ids
+        if app.grid:
+            ids = ids[app.grid.courses_of(ids) == 0]
+        fitness = birds.fitness[ids]
+        states = np.column_stack(
+            (birds.y[ids], birds.tilt[ids], birds.img_index[ids])
+        )
+    else:
+        # Birds of a Flock
+        members = list(birds)
+        fitness = np.array([g.fitness for g, net, bird in members])
+        states = np.array(
+            [(bird.y, bird.tilt, bird.IMGS.index(bird.img))
+             for g, net, bird in members],
+            dtype=np.float64,
+        ).reshape(-1, 3)
+    if top_k is not None and len(states) > top_k:
+        states = states[np.argsort(-fitness, kind="stable")[:top_k]]
+    return {
+        "birds": [
+            (y, int(tilt), int(img)) for y, tilt, img in states.tolist()
+        ],
+        "pipes": [(pipe.x, pipe.top_height) for pipe in app.pipes],
+        "base": (app.base.x1, app.base.x2),
+        "bird_x": app.BIRD_X,
+        "score": app.score,
+        "gen": app.gen_count,
+        "alive": len(birds),
+    }
+
+
+def _render_loop(snapshots, closed, size, frames_per_second):
+    """Main loop of the renderer process: draw the latest snapshot received
+    at most frames_per_second times per second, until the window is closed.
+    Args:
+    - snapshots: queue of the snapshots published by the simulation
+    - closed: event set when the window is closed
+    - size: (width, height) of the window
+    - frames_per_second: maximum frame rate of the window (int)
+    """
+    # Imported here, so the game images are only loaded by this process
+    from BIRD_pygame import Bird
+    from BASE_PIPE_pygame import Base, Pipe
+    from ASSETS_pygame import load_image, build_background, TextCache
+
+    win = pygame.display.set_mode(size)
+    pygame.display.set_caption("NEAT training")
+    pygame.font.init()
+    texts = TextCache(pygame.font.SysFont("comicsans", 40))
+    background = build_background(load_image("bg.png"), size)
+    clock = pygame.time.Clock()
+    base = Base(700)
+    # A single bird object drawing every bird of the snapshots
+    bird = Bird(0, 0)
+    snapshot = None
+
+    while not closed.is_set():
+        # Keep only the latest snapshot
+        try:
+            while True:
+                snapshot = snapshots.get_nowait()
+        except queue.Empty:
+            pass
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                closed.set()
+
+        if snapshot is not None:
+            win.blit(background, (0, 0))
+            for x, top_height in snapshot["pipes"]:
+                Pipe(x, top_height).draw(win)
+            base.x1, base.x2 = snapshot["base"]
+            base.draw(win)
+            bird.x = snapshot["bird_x"]
+            for y, tilt, img in snapshot["birds"]:
+                bird.y, bird.tilt, bird.img = y, tilt, Bird.IMGS[img]
+                bird.render(win)
+
+            # Same indicator texts as NeatApp.draw_all()
+            score_text = texts.render(
+                "score", "Score: " + str(snapshot["score"])
+            )
+            win.blit(score_text, (size[0] - 15 - score_text.get_width(), 15))
+            gen_text = texts.render("gens", "Gens: " + str(snapshot["gen"]))
+            win.blit(gen_text, (15, 15))
+            alive_text = texts.render(
+                "alive", "Alive: " + str(snapshot["alive"])
+            )
+            win.blit(alive_text, (15, 15 + gen_text.get_height() + 10))
+            pygame.display.update()
+
+        clock.tick(frames_per_second)
+    pygame.quit()
+
+
+
+class SnapshotRenderer:
+    """Class for the simulation side of the decoupled renderer: it starts
+    the renderer process, and publishes snapshots to it at the display rate.
+    """
+
+    def __init__(self, size, frames_per_second=30, top_k=None):
+        """Initialize the renderer and start its process.
+        Args:
+        - size: (width, height) of the window
+        - frames_per_second: maximum frame rate of the window (int)
+        - top_k: if given, only the K fittest birds are shown (int)
+        """
+        self.interval = 1 / frames_per_second
+        self.top_k = top_k
+        self.next_publish = 0
+        # A fresh process, not a copy of the simulation's one
+        context = multiprocessing.get_context("spawn")
+        self.snapshots = context.Queue(maxsize=2)
+        self.closed = context.Event()
+        self.process = context.Process(
+            target=_render_loop,
+            args=(self.snapshots, self.closed, size, frames_per_second),
+            daemon=True,
+        )
+        self.process.start()
+
+
+    def due(self):
+        """Check if a new snapshot should be published, ie. if the renderer
+        is still open and a display frame has passed since the last one.
+        """
+        now = time.perf_counter()
+        if now < self.next_publish or self.closed.is_set():
+            return False
+        self.next_publish = now + self.interval
+        return True
+
+
+    def publish(self, app):
+        """Method to send a snapshot of the game to the renderer, unless it
+        has not taken the previous ones yet.
+        Args:
+        - app: the NeatApp simulating a generation
+        """
+        snapshot = take_snapshot(app, self.top_k)
+        try:
+            self.snapshots.put_nowait(snapshot)
+        except queue.Full:
+            pass
+
+
+    def close(self):
+        """Method to close the window and stop the renderer process."""
+        self.closed.set()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.snapshots.cancel_join_thread()
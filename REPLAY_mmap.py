@@ -0,0 +1,343 @@
+import mmap
+import struct
+import argparse
+import numpy as np
+import pygame
+from BIRD_pygame import Bird
+from BASE_PIPE_pygame import Base, Pipe, PipeSchedule
+from POPULATION_numpy import BirdPopulation
+from ASSETS_pygame import load_image, build_background
+
+
+
+"""
+Replay logs of training runs. The flight of a bird only depends on the pipe
+course and on the frames at which it jumped, so a generation is fully
+recorded by its course seeds, and for every bird its jumps and when it left
+the game. Any bird of any generation can then be replayed exactly as it flew in
+training, with the BIRD, PIPE and BASE classes, without loading a network.
+
+File format (little-endian): the MAGIC bytes, then one record per generation:
+- header: generation, number of birds (rows), number of frames, number of
+  courses, and the size in bytes of the rest of the record
+- the course seeds (uint64, one per course)
+- the genome keys (int64, one per genome)
+- the last frame each bird moved in (int32, one per row)
+- the last frame each bird survived the collision checks in (int32, one
+  per row): the same frame for a bird stopped by the evaluation budget or
+  by the end of the generation, the frame before for a bird that crashed
+- the jump bitsets: one row of bits per frame, bit r set if bird r jumped
+  in that frame (uint8, packed with numpy.packbits)
+A row is a bird of a genome on a course: with multi-course fitness, row r is
+genome r % num_genomes on course r // num_genomes.
+
+The player memory-maps the file and only reads the records it needs, so long
+histories are cheap to open and to seek through.
+
+Usage:
+    python Main.py --headless --record run.replay
+    python REPLAY_mmap.py run.replay --gen 12 --bird 3
+"""
+
+
+# First bytes of every replay log, with the version of the format
+MAGIC = b"NEATRPL1"
+# Header of a generation record
+HEADER = struct.Struct("<IIIIQ")
+
+
+
+class ReplayRecorder:
+    """Class for recording the generations simulated by a NeatApp into a
+    replay log, one record appended per generation.
+    """
+
+    def __init__(self, path):
+        """Initialize the recorder, starting a new (empty) log.
+        Args:
+        - path: path of the replay log (str)
+        """
+        self.path = path
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+
+
+    def begin_generation(self, generation, seeds, genome_keys, birds):
+        """Method to start recording a generation.
+        Args:
+        - generation: number of the generation (int)
+        - seeds: seeds of the courses flown (list of int)
+        - genome_keys: keys of the genomes (list of int)
+        - birds: the birds of the generation, a Flock or a BirdPopulation
+        """
+        self.generation = generation
+        self.seeds = seeds
+        self.genome_keys = genome_keys
+        if isinstance(birds, BirdPopulation):
+            self.num_rows = birds.size
+            self.rows = None
+        else:
+            # Rows of the BIRD objects, in the order of the flock
+            self.num_rows = len(birds)
+            self.rows = {
+                id(bird): row for row, (g, net, bird) in enumerate(birds)
+            }
+        self.last_moved = np.full(self.num_rows, -1, dtype=np.int32)
+        self.last_survived = np.full(self.num_rows, -1, dtype=np.int32)
+        self.jumps = []
+
+
+    def _rows(self, birds, jumped=False):
+        """Get the rows of the birds alive, or of those that have just jumped
+        (a bird that has just jumped has a tick_count of 0).
+        """
+        if self.rows is None:
+            ids = birds.alive_ids
+            return ids[birds.tick_count[ids] == 0] if jumped else ids
+        return [
+            self.rows[id(bird)] for g, net, bird in birds
+            if not jumped or bird.tick_count == 0
+        ]
+
+
+    def record_moves(self, birds):
+        """Method to record a frame, once the birds alive have moved and
+        decided whether to jump.
+        Args:
+        - birds: the birds of the generation, a Flock or a BirdPopulation
+        """
+        frame = len(self.jumps)
+        self.last_moved[self._rows(birds)] = frame
+        bits = np.zeros(self.num_rows, dtype=bool)
+        bits[self._rows(birds, jumped=True)] = True
+        self.jumps.append(np.packbits(bits))
+
+
+    def record_survivors(self, birds):
+        """Method to record the birds still alive after the collision checks
+        of the frame.
+        Args:
+        - birds: the birds of the generation, a Flock or a BirdPopulation
+        """
+        self.last_survived[self._rows(birds)] = len(self.jumps) - 1
+
+
+    def end_generation(self):
+        """Method to append the record of the generation to the log."""
+        row_bytes = (self.num_rows + 7) // 8
+        if self.jumps:
+            jumps = np.stack(self.jumps)
+        else:
+            jumps = np.zeros((0, row_bytes), dtype=np.uint8)
+        payload = b"".join((
+            np.asarray(self.seeds, dtype="<u8").tobytes(),
+            np.asarray(self.genome_keys, dtype="<i8").tobytes(),
+            self.last_moved.astype("<i4").tobytes(),
+            self.last_survived.astype("<i4").tobytes(),
+            jumps.tobytes(),
+        ))
+        with open(self.path, "ab") as f:
+            f.write(HEADER.pack(
+                self.generation, self.num_rows, len(self.jumps),
+                len(self.seeds), len(payload),
+            ))
+            f.write(payload)
+        self.jumps = []
+
+
+
+class ReplayLog:
+    """Class for reading a replay log through a memory map. Opening a log
+    only reads the headers of its records.
+    """
+
+    def __init__(self, path):
+        """Open a replay log and index its generation records.
+        Args:
+        - path: path of the replay log (str)
+        """
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a replay log".format(path))
+        # Header fields and payload offset of each record, by generation
+        self.records = {}
+        offset = len(MAGIC)
+        while offset + HEADER.size <= len(self.map):
+            generation, num_rows, num_frames, num_courses, size = (
+                HEADER.unpack_from(self.map, offset)
+            )
+            offset += HEADER.size
+            # Ignore a record cut off by a crash while writing it
+            if offset + size > len(self.map):
+                break
+            self.records[generation] = (
+                num_rows, num_frames, num_courses, offset
+            )
+            offset += size
+
+
+    def generations(self):
+        """Return the numbers of the recorded generations."""
+        return sorted(self.records)
+
+
+    def generation(self, generation):
+        """Get the arrays of a generation record, as views of the memory map:
+        a dict with the course seeds, genome keys, last frames moved and
+        survived, and jump bitsets (one row of bytes per frame).
+        Args:
+        - generation: number of the generation (int)
+        """
+        num_rows, num_frames, num_courses, offset = self.records[generation]
+        record = {}
+        for name, dtype, count in (
+            ("seeds", "<u8", num_courses),
+            ("genome_keys", "<i8", num_rows // num_courses),
+            ("last_moved", "<i4", num_rows),
+            ("last_survived", "<i4", num_rows),
+            ("jumps", np.uint8, num_frames * ((num_rows + 7) // 8)),
+        ):
+            record[name] = np.frombuffer(self.map, dtype, count, offset)
+            offset += record[name].nbytes
+        record["jumps"] = record["jumps"].reshape(num_frames, -1)
+        return record
+
+
+    def bird(self, generation, row):
+        """Get what is needed to replay a bird: the seed of its course, the
+        key of its genome, its last frames moved and survived, and whether it
+        jumped in each frame up to its last one (bool array).
+        Args:
+        - generation: number of the generation (int)
+        - row: row of the bird in the generation (int)
+        """
+        record = self.generation(generation)
+        num_genomes = len(record["genome_keys"])
+        last_moved = int(record["last_moved"][row])
+        # Only unpack the column of bytes holding the bird's bits
+        column = record["jumps"][:last_moved + 1, row // 8]
+        return {
+            "seed": int(record["seeds"][row // num_genomes]),
+            "genome_key": int(record["genome_keys"][row % num_genomes]),
+            "last_moved": last_moved,
+            "last_survived": int(record["last_survived"][row]),
+            "jumps": ((column >> (7 - row % 8)) & 1).astype(bool),
+        }
+
+
+    def close(self):
+        """Method to close the memory map and the file. The arrays returned
+        by generation() must not be used anymore.
+        """
+        self.map.close()
+        self.file.close()
+
+
+
+def replay_bird(log, generation, row, win=None, frames_per_second=30,
+                bird_x=230, bird_y=350):
+    """Replay the flight of a bird from a replay log, drawn on a pygame
+    window if given, following the frame loop of NeatApp.eval_genomes().
+    Returns the fitness the bird reached and the score.
+    Args:
+    - log: a ReplayLog
+    - generation: number of the generation (int)
+    - row: row of the bird in the generation (int)
+    - win: pygame window to draw the flight on (default: not drawn)
+    - frames_per_second: maximum frame rate of the window (int)
+    - bird_x, bird_y: starting position of the bird (int)
+    """
+    flight = log.bird(generation, row)
+    course = PipeSchedule(flight["seed"])
+    bird = Bird(bird_x, bird_y)
+    base = Base(700)
+    pipes = [Pipe(700, course[0], 0)]
+    score = 0
+    fitness = 0
+    if win is not None:
+        background = build_background(load_image("bg.png"), win.get_size())
+        clock = pygame.time.Clock()
+
+    for frame, jump in enumerate(flight["jumps"].tolist()):
+        # Reward the bird for the frame, make it move, and jump as it did
+        fitness += 0.1
+        bird.move()
+        if jump:
+            bird.jump()
+        # A bird that crashed in this frame leaves before the pipes move
+        if frame > flight["last_survived"]:
+            break
+
+        # Same pipe updates as NeatApp.update_pipes()
+        add_pipe = False
+        for pipe in list(pipes):
+            if not pipe.passed and pipe.x + pipe.WIDTH < bird_x:
+                pipe.passed = True
+                add_pipe = True
+            removed = pipe.x + pipe.WIDTH < 0
+            pipe.move()
+            if removed:
+                pipes.remove(pipe)
+        if add_pipe:
+            score += 1
+            fitness += 5
+            pipes.append(Pipe(550, course[score], score))
+        base.move()
+
+        if win is None:
+            continue
+        clock.tick(frames_per_second)
+        win.blit(background, (0, 0))
+        for pipe in pipes:
+            pipe.draw(win)
+        base.draw(win)
+        bird.draw(win)
+        pygame.display.update()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return fitness, score
+    return fitness, score
+
+
+
+# Replay a bird of a replay log when this script is run directly
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay a bird of a generation from a replay log."
+    )
+    parser.add_argument("log", help="path of the replay log")
+    parser.add_argument(
+        "--gen", type=int, default=None,
+        help="generation to replay (default: the last one)",
+    )
+    parser.add_argument(
+        "--bird", type=int, default=None,
+        help="row of the bird to replay (default: the one that flew the "
+        "longest)",
+    )
+    parser.add_argument(
+        "--list", action="store_true",
+        help="list the recorded generations and exit",
+    )
+    args = parser.parse_args()
+
+    log = ReplayLog(args.log)
+    if args.list:
+        for gen in log.generations():
+            num_rows, num_frames = log.records[gen][:2]
+            print("Generation {}: {} birds, {} frames".format(
+                gen, num_rows, num_frames
+            ))
+    else:
+        gen = log.generations()[-1] if args.gen is None else args.gen
+        row = args.bird
+        if row is None:
+            row = int(np.argmax(log.generation(gen)["last_survived"]))
+        win = pygame.display.set_mode((530, 780))
+        fitness, score = replay_bird(log, gen, row, win)
+        print("Generation {}, bird {}: fitness {:.1f}, score {}".format(
+            gen, row, fitness, score
+        ))
+        pygame.quit()
+    log.close()
@@ -0,0 +1,123 @@
+# Generated by ASSETS_pygame.py from the images folder: do not edit.
+# Size (width, height) of each image after doubling its original size, and
+# its 2D bitmask as (number of identical rows, [(first x, last x + 1), ...])
+# runs of the spans of set bits of each row.
+SPRITES = {
+    "base.png": {
+        "size": (672, 224),
+        "mask": [
+            (224, [(0, 672)]),
+        ],
+    },
+    "bg.png": {
+        "size": (576, 1024),
+        "mask": [
+            (1024, [(0, 576)]),
+        ],
+    },
+    "bird1.png": {
+        "size": (68, 48),
+        "mask": [
+            (3, [(24, 48)]),
+            (1, [(23, 49)]),
+            (1, [(17, 51)]),
+            (2, [(16, 52)]),
+            (1, [(15, 53)]),
+            (1, [(13, 55)]),
+            (2, [(12, 56)]),
+            (1, [(11, 57)]),
+            (1, [(5, 59)]),
+            (2, [(4, 60)]),
+            (1, [(3, 60)]),
+            (7, [(0, 60)]),
+            (1, [(0, 61)]),
+            (1, [(0, 63)]),
+            (2, [(0, 64)]),
+            (1, [(0, 65)]),
+            (1, [(3, 68)]),
+            (2, [(4, 68)]),
+            (1, [(5, 68)]),
+            (1, [(7, 65)]),
+            (6, [(8, 64)]),
+            (1, [(9, 63)]),
+            (1, [(11, 61)]),
+            (2, [(12, 60)]),
+            (1, [(13, 59)]),
+            (1, [(19, 41)]),
+            (3, [(20, 40)]),
+        ],
+    },
+    "bird2.png": {
+        "size": (68, 48),
+        "mask": [
+            (3, [(24, 48)]),
+            (1, [(23, 49)]),
+            (1, [(17, 51)]),
+            (2, [(16, 52)]),
+            (1, [(15, 53)]),
+            (1, [(13, 55)]),
+            (2, [(12, 56)]),
+            (1, [(11, 57)]),
+            (1, [(9, 59)]),
+            (2, [(8, 60)]),
+            (1, [(7, 60)]),
+            (1, [(5, 60)]),
+            (6, [(4, 60)]),
+            (1, [(3, 61)]),
+            (1, [(0, 63)]),
+            (2, [(0, 64)]),
+            (1, [(0, 65)]),
+            (4, [(0, 68)]),
+            (1, [(3, 65)]),
+            (2, [(4, 64)]),
+            (1, [(5, 64)]),
+            (1, [(7, 64)]),
+            (2, [(8, 64)]),
+            (1, [(9, 63)]),
+            (1, [(11, 61)]),
+            (2, [(12, 60)]),
+            (1, [(13, 59)]),
+            (1, [(19, 41)]),
+            (3, [(20, 40)]),
+        ],
+    },
+    "bird3.png": {
+        "size": (68, 48),
+        "mask": [
+            (3, [(24, 48)]),
+            (1, [(23, 49)]),
+            (1, [(17, 51)]),
+            (2, [(16, 52)]),
+            (1, [(15, 53)]),
+            (1, [(13, 55)]),
+            (2, [(12, 56)]),
+            (1, [(11, 57)]),
+            (1, [(9, 59)]),
+            (2, [(8, 60)]),
+            (1, [(7, 60)]),
+            (1, [(5, 60)]),
+            (6, [(4, 60)]),
+            (1, [(4, 61)]),
+            (1, [(4, 63)]),
+            (2, [(4, 64)]),
+            (1, [(3, 65)]),
+            (4, [(0, 68)]),
+            (1, [(0, 65)]),
+            (6, [(0, 64)]),
+            (1, [(0, 63)]),
+            (1, [(3, 61)]),
+            (2, [(4, 60)]),
+            (1, [(5, 59)]),
+            (1, [(19, 41)]),
+            (3, [(20, 40)]),
+        ],
+    },
+    "pipe.png": {
+        "size": (104, 640),
+        "mask": [
+            (48, [(0, 104)]),
+            (1, [(3, 101)]),
+            (591, [(4, 100)]),
+        ],
+    },
+}
@@ -0,0 +1,495 @@
+import io
+import os
+import csv
+import math
+import time
+import random
+import argparse
+import itertools
+import contextlib
+import configparser
+import multiprocessing
+from CHECKPOINT_neat import capture_state, write_checkpoint
+
+
+
+"""
+Hyperparameter sweeps over variants of the NEAT config file. A sweep spec
+lists values for keys of the config file, in the same sections:
+
+    [Sweep]
+    # grid: every combination of the values, random: 'samples' draws
+    search        = grid
+    samples       = 10
+    # Every variant is run once per seed, with the same seeds
+    seeds         = 1, 2, 3
+    generations   = 30
+    # Early abort: after this many generations, only the best keep_fraction
+    # of the variants carry on (0 to run every variant to the end)
+    abort_after   = 10
+    keep_fraction = 0.5
+
+    [NEAT]
+    pop_size = 50, 100, 150
+
+    [DefaultGenome]
+    conn_add_prob = 0.3, 0.5, 0.7
+    # A range low..high is drawn uniformly (random search only)
+    weight_mutate_power = 0.1..1.0
+
+Each variant is written as a full config file, and each (variant, seed)
+run evolves headless in a pool of worker processes, with a seeded course
+and random module, so every variant faces the same courses and a sweep can
+be repeated exactly.
+
+Early abort works like the evaluation budget, by successive halving: every
+run first evolves for abort_after generations and is checkpointed, then the
+variants are ranked by their mean best fitness over the seeds, and only the
+runs of the best keep_fraction of them are resumed from their checkpoints.
+A resumed run evolves exactly like an uninterrupted one, so aborting the
+losing variants does not change the results of the others.
+
+The results are printed as a table and written to results.csv (one row per
+variant: runs reaching the fitness threshold, mean generations to reach it,
+mean best fitness and mean wall time) and runs.csv (one row per run), next
+to the variant config files.
+
+Usage:
+    python SWEEP_multiprocessing.py sweep.txt --output sweeps/ --workers 8
+"""
+
+
+
+def _parse_range(value):
+    """Parse a 'low..high' range into a (low, high) tuple of ints, or of
+    floats if either bound is one, or return None if the value is a list.
+    """
+    if ".." not in value:
+        return None
+    low, high = (bound.strip() for bound in value.split("..", 1))
+    try:
+        return int(low), int(high)
+    except ValueError:
+        return float(low), float(high)
+
+
+def _run(task):
+    """Evolve a variant on a seed up to a number of generations, in a worker
+    process, and return the outcome of the run.
+    Args:
+    - task: (config_path, seed, engine, generations, resume, save), where
+    resume is the checkpoint to carry on from, and save the path to
+    checkpoint the run to if it stops before solving (str or None)
+    """
+    config_path, seed, engine, generations, resume, save = task
+    # Imported here, as the workers only need them to evolve the runs
+    import neat
+    from Main import NeatApp
+    if resume is None:
+        random.seed(seed)
+    started = time.perf_counter()
+    # The runner reports the progress of the runs, not the workers
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = NeatApp(
+            config_path, headless=True, engine=engine, seed=seed,
+            resume=resume,
+        )
+    population = app.p
+    solved_at = None
+    status = "running"
+    try:
+        while population.generation < generations:
+            generation = population.generation
+            population.run(app.eval_genomes, 1)
+            # Population.run() stops before breeding the next generation ...
+            # ...once the fitness threshold is met
+            if population.generation == generation:
+                solved_at = generation + 1
+                status = "solved"
+                break
+    except neat.CompleteExtinctionException:
+        status = "extinct"
+    if status == "running":
+        if save:
+            write_checkpoint(
+                save, capture_state(population, population.generation)
+            )
+        status = "done"
+    return {
+        "best_fitness": population.best_genome.fitness,
+        "generations": solved_at or population.generation,
+        "solved_at": solved_at,
+        "seconds": time.perf_counter() - started,
+        "status": status,
+    }
+
+
+
+class SweepSpec:
+    """Class for the search space of a sweep and the settings of its runs,
+    read from a sweep spec file.
+    """
+
+    # Section of the spec file holding the settings of the sweep
+    SECTION = "Sweep"
+
+    def __init__(self, params, search="grid", samples=10, seeds=(1,),
+                 generations=30, abort_after=0, keep_fraction=0.5,
+                 sample_seed=0):
+        """Initialize the spec.
+        Args:
+        - params: values of each swept key of the config file, as a dict
+        of {(section, key): list of str, or (low, high) range}
+        - search: "grid" for every combination, "random" for draws (str)
+        - samples: number of variants drawn by a random search (int)
+        - seeds: seeds every variant is run with (list of int)
+        - generations: maximum number of generations of a run (int)
+        - abort_after: generation after which the losing variants are
+        aborted, 0 for none (int)
+        - keep_fraction: fraction of the variants carrying on (float)
+        - sample_seed: seed of the draws of a random search (int)
+        """
+        if search not in ("grid", "random"):
+            raise ValueError(
+                "Unknown search {!r}, expected grid or random".format(search)
+            )
+        if not params:
+            raise ValueError("The sweep has no config keys to vary")
+        if search == "grid":
+            ranges = [key for key, values in params.items()
+                      if isinstance(values, tuple)]
+            if ranges:
+                raise ValueError(
+                    "A grid search needs lists of values, not ranges: "
+                    "{}".format(ranges)
+                )
+        if not 0 < keep_fraction <= 1:
+            raise ValueError("keep_fraction must be in (0, 1]")
+        if not seeds:
+            raise ValueError("The sweep needs at least one seed")
+        self.params = params
+        self.search = search
+        self.samples = samples
+        self.seeds = list(seeds)
+        self.generations = generations
+        self.abort_after = abort_after
+        self.keep_fraction = keep_fraction
+        self.sample_seed = sample_seed
+
+
+    @classmethod
+    def from_file(cls, path):
+        """Read a spec from a sweep spec file.
+        Args:
+        - path: path of the spec file (str)
+        """
+        parser = configparser.ConfigParser()
+        if not parser.read(path):
+            raise ValueError("Cannot read the sweep spec {}".format(path))
+        settings = (
+            parser[cls.SECTION] if parser.has_section(cls.SECTION) else {}
+        )
+        params = {}
+        for section in parser.sections():
+            if section == cls.SECTION:
+                continue
+            for key, value in parser[section].items():
+                params[section, key] = _parse_range(value) or [
+                    item.strip() for item in value.split(",")
+                ]
+        return cls(
+            params,
+            search=settings.get("search", "grid"),
+            samples=int(settings.get("samples", 10)),
+            seeds=[
+                int(seed) for seed in settings.get("seeds", "1").split(",")
+            ],
+            generations=int(settings.get("generations", 30)),
+            abort_after=int(settings.get("abort_after", 0)),
+            keep_fraction=float(settings.get("keep_fraction", 0.5)),
+            sample_seed=int(settings.get("sample_seed", 0)),
+        )
+
+
+    def variants(self):
+        """Get the variants of the sweep, as a list of dicts of
+        {(section, key): value}.
+        """
+        keys = list(self.params)
+        if self.search == "grid":
+            return [
+                dict(zip(keys, values))
+                for values in itertools.product(
+                    *(self.params[key] for key in keys)
+                )
+            ]
+        rng = random.Random(self.sample_seed)
+        variants = []
+        for _ in range(self.samples):
+            variant = {}
+            for key in keys:
+                values = self.params[key]
+                if not isinstance(values, tuple):
+                    variant[key] = rng.choice(values)
+                elif isinstance(values[0], int) and isinstance(values[1], int):
+                    variant[key] = str(rng.randint(*values))
+                else:
+                    variant[key] = "{:.4g}".format(rng.uniform(*values))
+            variants.append(variant)
+        return variants
+
+
+
+class SweepRunner:
+    """Class for running the variants of a sweep in a pool of worker
+    processes, with early abort of the losing variants.
+    """
+
+    def __init__(self, spec, config_path, output_dir, workers=None,
+                 engine="numpy"):
+        """Initialize the runner, and write the config file of every
+        variant to the output directory.
+        Args:
+        - spec: the SweepSpec of the sweep
+        - config_path: The path to the base configuration file.
+        - output_dir: directory of the variant configs and results (str)
+        - workers: Number of worker processes (default: CPU count)
+        - engine: The engine simulating the birds (str)
+        """
+        self.spec = spec
+        self.output_dir = output_dir
+        self.workers = workers or multiprocessing.cpu_count()
+        self.engine = engine
+        self.variants = spec.variants()
+        os.makedirs(output_dir, exist_ok=True)
+        self.config_paths = []
+        for index, variant in enumerate(self.variants):
+            path = os.path.join(output_dir, "variant{}.txt".format(index))
+            self.write_config(config_path, variant, path)
+            self.config_paths.append(path)
+        # Outcome of every run, by (variant, seed), and variants aborted
+        self.runs = {}
+        self.aborted = set()
+
+
+    @staticmethod
+    def write_config(config_path, variant, path):
+        """Write a copy of the config file with the values of a variant.
+        Args:
+        - config_path: The path to the base configuration file.
+        - variant: values of the variant, as a dict of {(section, key): str}
+        - path: path of the variant config file (str)
+        """
+        parser = configparser.ConfigParser()
+        parser.read(config_path)
+        for (section, key), value in variant.items():
+            if not parser.has_option(section, key):
+                raise ValueError(
+                    "Unknown config key {!r} in section [{}] of {}".format(
+                        key, section, config_path
+                    )
+                )
+            parser[section][key] = value
+        with open(path, "w") as f:
+            parser.write(f)
+
+
+    def _checkpoint_path(self, index, seed):
+        """Get the path of the checkpoint of a run at the abort rung."""
+        return os.path.join(
+            self.output_dir, "variant{}-seed{}.ckpt".format(index, seed)
+        )
+
+
+    def _evolve(self, pool, runs, generations, resume, save):
+        """Evolve runs up to a number of generations in the pool, adding
+        their wall time to that of their previous phase.
+        Args:
+        - pool: the pool of worker processes
+        - runs: (variant index, seed) of the runs (list of tuples)
+        - generations: number of generations to evolve up to (int)
+        - resume, save: whether the runs carry on from, and are saved to,
+        their checkpoints (bool)
+        """
+        tasks = [
+            (
+                self.config_paths[index], seed, self.engine, generations,
+                self._checkpoint_path(index, seed) if resume else None,
+                self._checkpoint_path(index, seed) if save else None,
+            )
+            for index, seed in runs
+        ]
+        for run, outcome in zip(runs, pool.imap(_run, tasks)):
+            if run in self.runs:
+                outcome["seconds"] += self.runs[run]["seconds"]
+            self.runs[run] = outcome
+            print("Variant {}, seed {}: {}, best fitness {:.1f}, {} "
+                  "generations".format(
+                      run[0], run[1], outcome["status"],
+                      outcome["best_fitness"], outcome["generations"],
+                  ))
+
+
+    def run(self):
+        """Method to run every variant on every seed, aborting the losing
+        variants after abort_after generations, and return the results of
+        the variants (list of dicts, best first).
+        """
+        spec = self.spec
+        runs = [
+            (index, seed)
+            for index in range(len(self.variants)) for seed in spec.seeds
+        ]
+        abort = 0 < spec.abort_after < spec.generations
+        # Spawned processes do not inherit the pygame state of this one
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(self.workers) as pool:
+            if abort:
+                self._evolve(pool, runs, spec.abort_after, False, True)
+                # Keep the variants with the highest mean best fitness
+                ranked = sorted(
+                    range(len(self.variants)),
+                    key=lambda index: -self.mean(index, "best_fitness"),
+                )
+                kept = max(1, math.ceil(spec.keep_fraction * len(ranked)))
+                self.aborted = set(ranked[kept:])
+                print("Aborting variants {} after {} generations".format(
+                    sorted(self.aborted), spec.abort_after
+                ))
+                runs = [
+                    (index, seed) for index, seed in runs
+                    if index not in self.aborted
+                    and self.runs[index, seed]["status"] == "done"
+                ]
+            self._evolve(pool, runs, spec.generations, abort, False)
+
+        for index in range(len(self.variants)):
+            for seed in spec.seeds:
+                path = self._checkpoint_path(index, seed)
+                if os.path.exists(path):
+                    os.remove(path)
+        results = self.results()
+        self.write_results(results)
+        return results
+
+
+    def mean(self, index, field, solved_only=False):
+        """Get the mean of a field of the runs of a variant, or None if
+        there are none (only over the solved runs if solved_only).
+        """
+        values = [
+            self.runs[index, seed][field] for seed in self.spec.seeds
+            if not solved_only or self.runs[index, seed]["solved_at"]
+        ]
+        return sum(values) / len(values) if values else None
+
+
+    def results(self):
+        """Get the results of the variants, best first: most runs reaching
+        the threshold, then fewest generations to reach it, then highest
+        best fitness.
+        """
+        results = []
+        for index, variant in enumerate(self.variants):
+            results.append({
+                "variant": index,
+                "params": variant,
+                "solved": sum(
+                    1 for seed in self.spec.seeds
+                    if self.runs[index, seed]["solved_at"]
+                ),
+                "generations_to_threshold": self.mean(
+                    index, "solved_at", solved_only=True
+                ),
+                "best_fitness": self.mean(index, "best_fitness"),
+                "wall_time": self.mean(index, "seconds"),
+                "status": "aborted" if index in self.aborted else "done",
+            })
+        results.sort(key=lambda r: (
+            -r["solved"], r["generations_to_threshold"] or math.inf,
+            -r["best_fitness"],
+        ))
+        return results
+
+
+    def write_results(self, results):
+        """Method to print the results table, and write it to results.csv
+        and the outcome of every run to runs.csv.
+        Args:
+        - results: the results of the variants, as returned by results()
+        """
+        names = ["{}.{}".format(*key) for key in self.spec.params]
+        columns = ["variant"] + names + [
+            "solved", "generations_to_threshold", "best_fitness",
+            "wall_time_s", "status",
+        ]
+        rows = []
+        for r in results:
+            gens = r["generations_to_threshold"]
+            rows.append(
+                [r["variant"]] + list(r["params"].values()) + [
+                    "{}/{}".format(r["solved"], len(self.spec.seeds)),
+                    "-" if gens is None else "{:.1f}".format(gens),
+                    "{:.1f}".format(r["best_fitness"]),
+                    "{:.1f}".format(r["wall_time"]),
+                    r["status"],
+                ]
+            )
+        with open(os.path.join(self.output_dir, "results.csv"), "w",
+                  newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        with open(os.path.join(self.output_dir, "runs.csv"), "w",
+                  newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([
+                "variant", "seed", "status", "generations", "best_fitness",
+                "wall_time_s",
+            ])
+            for (index, seed), outcome in sorted(self.runs.items()):
+                writer.writerow([
+                    index, seed, outcome["status"], outcome["generations"],
+                    outcome["best_fitness"], round(outcome["seconds"], 3),
+                ])
+
+        # Print the table with aligned columns
+        table = [columns] + [[str(cell) for cell in row] for row in rows]
+        widths = [max(len(cell) for cell in column) for column in zip(*table)]
+        print()
+        for row in table:
+            print("  ".join(
+                cell.ljust(w) for cell, w in zip(row, widths)
+            ).rstrip())
+
+
+
+# Run a sweep when this script is run directly
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run a hyperparameter sweep over NEAT config variants."
+    )
+    parser.add_argument("spec", help="path of the sweep spec file")
+    parser.add_argument(
+        "--config", default="./config-feedforward.txt",
+        help="path to the base NEAT configuration file",
+    )
+    parser.add_argument(
+        "--output", default="sweep",
+        help="directory of the variant configs and results",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="number of worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--engine", choices=("objects", "numpy"), default="numpy",
+        help="engine simulating the birds",
+    )
+    args = parser.parse_args()
+
+    runner = SweepRunner(
+        SweepSpec.from_file(args.spec), args.config, args.output,
+        args.workers, args.engine,
+    )
+    runner.run()
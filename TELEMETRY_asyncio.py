@@ -0,0 +1,234 @@
+import json
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from neat.reporting import BaseReporter
+
+
+
+"""
+Live telemetry of a training run, for long headless runs whose only other
+feedback is the text of neat.StdOutReporter.
+
+After every generation, a TelemetryReporter publishes a JSON object with
+its statistics: best and mean fitness, number of species, score reached,
+frames simulated and frames per second, and the number of birds alive over
+time (sampled down to at most MAX_CURVE_POINTS frames). A TelemetryServer
+streams them as JSON lines, one per generation, to every client connected
+to its local TCP port, either over a raw socket:
+    nc 127.0.0.1 8765
+or as a minimal HTTP response, streamed until the end of the run:
+    curl -N http://127.0.0.1:8765/
+A client connecting during the run first receives the latest generations.
+
+The server runs an asyncio event loop in a background thread. Publishing
+only hands the line over to that loop, so the evaluation never waits for the
+clients: each client has a bounded queue, and a client too slow to keep up
+loses its oldest lines instead of holding the others back.
+"""
+
+
+# Maximum number of points of the alive-over-time curve of a generation
+MAX_CURVE_POINTS = 200
+# Headers of the HTTP response, streamed without a content length
+HTTP_HEADERS = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/x-ndjson\r\n"
+    b"Cache-Control: no-cache\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+
+
+
+class TelemetryServer:
+    """Class for a local server streaming JSON lines to its clients, with
+    its asyncio event loop running in a background thread.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, queue_size=100,
+                 history=100):
+        """Initialize the server and start its thread.
+        Args:
+        - host: address the server listens on (str)
+        - port: TCP port the server listens on, 0 for any free port (int)
+        - queue_size: number of lines a slow client can fall behind (int)
+        - history: number of latest lines sent to a new client (int)
+        """
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.history = deque(maxlen=history)
+        # Queues of the lines to send to each client, and their tasks
+        self.clients = set()
+        self.tasks = set()
+        self.error = None
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, args=(started,), daemon=True
+        )
+        self.thread.start()
+        # An error while starting the server is raised here, in the caller
+        if not started.wait(timeout=5):
+            raise RuntimeError(
+                "The telemetry server did not start on {}:{}".format(
+                    self.host, self.port
+                )
+            )
+        if self.error:
+            raise self.error
+
+
+    def _run(self, started):
+        """Start listening and run the event loop (in the background
+        thread).
+        """
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._serve, self.host, self.port)
+            )
+            # The actual port, when any free port was asked for
+            self.port = self.server.sockets[0].getsockname()[1]
+        except Exception as error:
+            self.error = error
+            started.set()
+            self.loop.close()
+            return
+        started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+
+    async def _serve(self, reader, writer):
+        """Stream the lines to a client until it disconnects or the server
+        is closed.
+        """
+        self.tasks.add(asyncio.current_task())
+        queue = asyncio.Queue(self.queue_size)
+        try:
+            # An HTTP client sends its request first, a raw client nothing
+            try:
+                request = await asyncio.wait_for(reader.readline(), 0.5)
+            except asyncio.TimeoutError:
+                request = b""
+            if request.startswith(b"GET "):
+                while await reader.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                writer.write(HTTP_HEADERS)
+            # Send the latest lines, then subscribe to the next ones
+            for line in self.history:
+                writer.write(line)
+            self.clients.add(queue)
+            while True:
+                await writer.drain()
+                line = await queue.get()
+                if line is None:
+                    break
+                writer.write(line)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(queue)
+            self.tasks.discard(asyncio.current_task())
+            writer.close()
+
+
+    def _broadcast(self, line):
+        """Queue a line for every client (in the event loop). A client whose
+        queue is full loses its oldest line.
+        Args:
+        - line: the line to send, or None to end the streams
+        """
+        if line is not None:
+            self.history.append(line)
+        for queue in self.clients:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(line)
+
+
+    def publish(self, message):
+        """Method to send a message to all clients, without waiting for
+        them.
+        Args:
+        - message: JSON-serializable object, sent as one line
+        """
+        line = (json.dumps(message) + "\n").encode()
+        self.loop.call_soon_threadsafe(self._broadcast, line)
+
+
+    async def _shutdown(self):
+        """End the streams of the clients and stop listening."""
+        self._broadcast(None)
+        self.server.close()
+        if self.tasks:
+            # Let the clients receive their last lines
+            done, pending = await asyncio.wait(set(self.tasks), timeout=2)
+            for task in pending:
+                task.cancel()
+        await self.server.wait_closed()
+
+
+    def close(self):
+        """Method to send the lines published so far, disconnect the clients
+        and stop the server thread.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        try:
+            future.result(timeout=5)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+
+
+
+class TelemetryReporter(BaseReporter):
+    """Class for a neat-python reporter publishing the statistics of every
+    generation to a TelemetryServer.
+    """
+
+    def __init__(self, server, app):
+        """Initialize the reporter.
+        Args:
+        - server: the TelemetryServer streaming the statistics
+        - app: the NeatApp evaluating the generations
+        """
+        self.server = server
+        self.app = app
+        self.generation = None
+        self.started = None
+
+
+    def start_generation(self, generation):
+        """Record the generation number and its start time."""
+        self.generation = generation
+        self.started = time.perf_counter()
+
+
+    def post_evaluate(self, config, population, species, best_genome):
+        """Publish the statistics of the generation just evaluated."""
+        seconds = time.perf_counter() - self.started
+        fitness = [g.fitness for g in population.values()]
+        # With --workers, the frames and birds alive over time are rebuilt ...
+        # ...from the flights simulated in the worker processes
+        frames = self.app.frame_count
+        curve = self.app.alive_curve
+        every = max(1, math.ceil(len(curve) / MAX_CURVE_POINTS))
+        self.server.publish({
+            "generation": self.generation,
+            "time": time.time(),
+            "best_fitness": max(fitness),
+            "mean_fitness": sum(fitness) / len(fitness),
+            "population": len(population),
+            "species": len(species.species),
+            "score": self.app.score,
+            "frames": frames,
+            "seconds": seconds,
+            "frames_per_s": frames / seconds,
+            "alive": curve[::every],
+            "alive_every": every,
+        })
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+
+"""
+Precomputed trajectories of the birds. Between two jumps, the motion of a
+bird only depends on the number of ticks since its last jump (tick_count)
+and on its initial velocity, which is always the jump velocity after a jump,
+or 0 after spawning: the displacement of every tick follows the same
+quadratic, 16-pixel clamp and 2-pixel boost, and the tilt the same rule of
+the bird's offset below its original height. So both are tabulated once per
+initial velocity, and a bird advances by looking up its tick in the tables.
+
+Every displacement is a multiple of half a pixel, so adding the tabulated
+displacements to y gives exactly the same positions as evaluating the
+quadratic, and the offset of a bird below its original height is exactly
+the cumulative offset of the table, which decides the tilt.
+
+After STEADY_TICKS ticks, the motion is steady: every bird falls 16 pixels
+per tick with its nose fully down, so the tables stop there and any later
+tick reads their last entry.
+"""
+
+
+# Number of ticks after which the motion of a bird is steady
+STEADY_TICKS = 64
+
+
+
+class Trajectory:
+    """Class for the displacement, cumulative offset and tilt of a bird at
+    every tick of a jumping-falling session, from its initial velocity.
+    """
+
+    def __init__(self, vel, acceleration, max_rotation, rot_vel,
+                 ticks=STEADY_TICKS):
+        """Tabulate the trajectory with the same maths as Bird.move(). Entry
+        t of each table is the value at tick t (entry 0 is the start).
+        Args:
+        - vel: initial velocity of the session (float)
+        - acceleration, max_rotation, rot_vel: physics constants of a bird
+        - ticks: number of tabulated ticks (int)
+        """
+        self.vel = vel
+        self.ticks = ticks
+        displacements = [0.0]
+        offsets = [0.0]
+        tilts = [max_rotation]
+        for t in range(1, ticks + 1):
+            displacement = vel * t + 0.5 * acceleration * (t**2)
+            if displacement >= 16:
+                displacement = 16
+            if displacement < 0:
+                displacement -= 2
+            displacements.append(displacement)
+            offsets.append(offsets[-1] + displacement)
+            if offsets[-1] < 50:
+                tilts.append(max_rotation)
+            elif t == 1:
+                raise ValueError(
+                    "The tilt of the first tick depends on the previous one"
+                )
+            else:
+                tilts.append(
+                    tilts[-1] - rot_vel if tilts[-1] > -90 else tilts[-1]
+                )
+        if displacements[-1] != 16 or tilts[-1] > -90 or offsets[-1] < 50:
+            raise ValueError(
+                "The motion is not steady after {} ticks".format(ticks)
+            )
+        # Lists for the BIRD objects, arrays for the BirdPopulation
+        self.displacements = displacements
+        self.offsets = offsets
+        self.tilts = tilts
+        self.displacement_array = np.array(displacements, dtype=np.float64)
+        self.offset_array = np.array(offsets, dtype=np.float64)
+        self.tilt_array = np.array(tilts, dtype=np.int64)